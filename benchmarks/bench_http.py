@@ -0,0 +1,68 @@
+"""Measures HTTPClient throughput against the in-process FakeGitHub server.
+
+    python benchmarks/bench_http.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from sapid.cache import ResponseCache
+from sapid.http import AuthInfo, HTTPClient
+from sapid.retry import RetryPolicy
+from sapid.testing import FakeGitHub
+
+
+REQUESTS = 2000
+CONCURRENCY = 50
+
+def _auth(directory: str) -> AuthInfo:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    fp = os.path.join(directory, "bench.pem")
+    with open(fp, "wb") as f:
+        f.write(pem)
+    return AuthInfo(pem_fp=fp, app_id="1", client_secret="", client_id="")
+
+async def _run(name: str, auth: AuthInfo, fake: FakeGitHub, *, distinct: int, **options):
+    http = HTTPClient(auth, base_url=fake.url, **options)
+    http.recreate()
+    fake.requests.clear()
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i: int):
+        async with semaphore:
+            await http.fetch_issue("org1", "repo", i % distinct + 1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    await http.close()
+
+    served = sum(fake.requests.values())
+    print("{0:<36} {1:>8,.0f} req/s  {2:>5} hit the server  coalesced={3}  retries={4}".format(
+        name, REQUESTS / elapsed, served, http.coalesced_requests, sum(http.retry_policy.retries.values())
+    ))
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        auth = _auth(directory)
+
+        async with FakeGitHub(latency=0.005) as fake:
+            await _run("fetch_issue, 2000 distinct", auth, fake, distinct=REQUESTS)
+            await _run("fetch_issue, 20 hot issues", auth, fake, distinct=20)
+            await _run("fetch_issue, 20 hot issues + ETags", auth, fake, distinct=20, response_cache=ResponseCache())
+
+        async with FakeGitHub(latency=0.005, failure_rate=0.05, seed=1) as fake:
+            await _run("fetch_issue, 5% injected 502s", auth, fake, distinct=REQUESTS, retry_policy=RetryPolicy(base_delay=0.01))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Compares the old str-based JSON decoding with the configured codecs.
+
+    python benchmarks/bench_json.py
+"""
+import json
+import time
+
+from sapid.codec import JSONCodec, ORJSON_EXISTS, OrjsonCodec
+
+
+DURATION = 1.0
+
+def _user(i: int) -> dict:
+    login = "user{}".format(i)
+    api = "https://api.github.com/users/" + login
+    return {
+        "login": login, "id": i, "node_id": "MDQ6VXNlcj" + str(i),
+        "avatar_url": "https://avatars.githubusercontent.com/u/{}?v=4".format(i),
+        "gravatar_id": "", "url": api, "html_url": "https://github.com/" + login,
+        "followers_url": api + "/followers", "following_url": api + "/following{/other_user}",
+        "gists_url": api + "/gists{/gist_id}", "starred_url": api + "/starred{/owner}{/repo}",
+        "subscriptions_url": api + "/subscriptions", "organizations_url": api + "/orgs",
+        "repos_url": api + "/repos", "events_url": api + "/events{/privacy}",
+        "received_events_url": api + "/received_events", "type": "User", "site_admin": False
+    }
+
+def _commit(i: int) -> dict:
+    return {
+        "id": "{:040x}".format(i), "tree_id": "{:040x}".format(i * 7),
+        "distinct": True, "message": "Fix the thing in module {}\n\nLonger description of the change.".format(i),
+        "timestamp": "2022-01-01T00:00:00Z",
+        "url": "https://github.com/o/r/commit/{:040x}".format(i),
+        "author": {"name": "Someone", "email": "someone@example.com", "username": "user{}".format(i)},
+        "committer": {"name": "Someone", "email": "someone@example.com", "username": "user{}".format(i)},
+        "added": ["src/new_{}.py".format(i)], "removed": [], "modified": ["src/a.py", "README.md"]
+    }
+
+def push_payload(commits: int) -> bytes:
+    payload = {
+        "ref": "refs/heads/main", "before": "0" * 40, "after": "f" * 40,
+        "repository": {"id": 1, "name": "r", "full_name": "o/r", "owner": _user(1), "private": False},
+        "pusher": {"name": "user1", "email": "user1@example.com"},
+        "sender": _user(1), "installation": {"id": 1},
+        "commits": [_commit(i) for i in range(commits)],
+        "head_commit": _commit(commits)
+    }
+    return json.dumps(payload).encode("utf-8")
+
+def _rate(func, body: bytes) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        func(body)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+def main():
+    decoders = [
+        ("str + json.loads (old)", lambda body: json.loads(body.decode("utf-8"))),
+        ("JSONCodec.loads", JSONCodec().loads),
+    ]
+    if ORJSON_EXISTS:
+        decoders.append(("OrjsonCodec.loads", OrjsonCodec().loads))
+
+    for commits in (1, 20, 200, 2000):
+        body = push_payload(commits)
+        print("push payload, {0} commits, {1:,} bytes".format(commits, len(body)))
+        for name, func in decoders:
+            rate = _rate(func, body)
+            print("  {0:<24} {1:>10,.0f} payloads/s {2:>10.1f} MB/s".format(name, rate, rate * len(body) / 1e6))
+
+if __name__ == "__main__":
+    main()
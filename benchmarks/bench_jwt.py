@@ -0,0 +1,67 @@
+"""Compares app JWT throughput before and after caching the signed token.
+
+    python benchmarks/bench_jwt.py
+"""
+import os
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from sapid.http import AuthInfo
+from sapid.utils import generate_jwt
+
+
+DURATION = 2.0
+
+def _write_key(directory: str) -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    fp = os.path.join(directory, "bench.pem")
+    with open(fp, "wb") as f:
+        f.write(pem)
+    return fp
+
+def _rate(func) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        func()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        fp = _write_key(directory)
+        with open(fp, "r") as f:
+            pem = f.read()
+
+        auth = AuthInfo(pem_fp=fp, app_id="1", client_secret="", client_id="")
+
+        def pem_per_call():
+            # what request_with_jwt used to do: parse the PEM and sign every time.
+            epoch = int(time.time())
+            payload = {"iss": "1", "iat": epoch - 60, "exp": epoch + 600}
+            generate_jwt(payload=payload, key=pem, headers={})
+
+        def key_object_per_call():
+            epoch = int(time.time())
+            payload = {"iss": "1", "iat": epoch - 60, "exp": epoch + 600}
+            generate_jwt(payload=payload, key=auth.private_key, headers={})
+
+        results = [
+            ("PEM string, signed per call", _rate(pem_per_call)),
+            ("loaded key, signed per call", _rate(key_object_per_call)),
+            ("AuthInfo.get_jwt (cached)", _rate(auth.get_jwt)),
+        ]
+
+    for name, rate in results:
+        print("{0:<32} {1:>14,.0f} tokens/s".format(name, rate))
+
+if __name__ == "__main__":
+    main()
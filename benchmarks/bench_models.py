@@ -0,0 +1,95 @@
+"""Measures model construction for issue_comment deliveries.
+
+"lazy" builds the objects the way parse_issue_comment does and reads only
+``comment.body``. "hydrated" then touches every field, which is what the
+models used to do eagerly in their constructors.
+
+The bytes per delivery include the decoded payload, which the models keep
+alive in both variants.
+
+    python benchmarks/bench_models.py
+"""
+import json
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from sapid.comment import Comment
+from sapid.issue import Issue
+from sapid.repository import Repository
+from sapid.user import BaseUser
+from sapid.testing import FakeGitHub
+from sapid.utils import _lazy_field_names
+
+
+DURATION = 1.0
+STATE = SimpleNamespace()
+
+def issue_comment_payload(assignees: int, labels: int) -> dict:
+    issue = FakeGitHub.make_issue("octo", "repo", 7, id=7007)
+    issue["assignees"] = [FakeGitHub.make_user(100 + i) for i in range(assignees)]
+    issue["assignee"] = issue["assignees"][0] if assignees else None
+    issue["labels"] = [
+        {"id": i, "name": "label-{}".format(i), "color": "ededed", "default": False}
+        for i in range(labels)
+    ]
+    return {
+        "action": "created",
+        "issue": issue,
+        "comment": FakeGitHub.make_comment("octo", "repo", 7, id=9009, body="Looks good to me."),
+        "repository": FakeGitHub.make_repository("octo", "repo"),
+        "sender": FakeGitHub.make_user(1),
+        "installation": {"id": 1}
+    }
+
+def _hydrate(obj):
+    for name in _lazy_field_names(type(obj)):
+        value = getattr(obj, name)
+        if isinstance(value, list):
+            for item in value:
+                if hasattr(item, "_data"):
+                    _hydrate(item)
+        elif hasattr(value, "_data"):
+            _hydrate(value)
+
+def parse(data: dict, hydrate: bool):
+    repo = Repository(state=STATE, data=data["repository"], installation_id=data["installation"]["id"])
+    issue = Issue(state=STATE, data=data["issue"], repository=repo)
+    comment = Comment(state=STATE, data=data["comment"], issue=issue)
+    sender = BaseUser(state=STATE, data=data["sender"])
+    comment.body
+    if hydrate:
+        for obj in (repo, issue, comment, sender):
+            _hydrate(obj)
+    return repo, issue, comment, sender
+
+def _rate(data: dict, hydrate: bool) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        parse(data, hydrate)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+def _bytes_per_delivery(data: dict, hydrate: bool, deliveries: int = 1000) -> float:
+    # every delivery decodes its own payload, as the server does.
+    body = json.dumps(data)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [parse(json.loads(body), hydrate) for _ in range(deliveries)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / deliveries
+
+def main():
+    for assignees, labels in ((1, 2), (10, 20), (50, 100)):
+        data = issue_comment_payload(assignees, labels)
+        print("issue_comment, {0} assignees, {1} labels".format(assignees, labels))
+        for name, hydrate in (("lazy", False), ("hydrated", True)):
+            rate = _rate(data, hydrate)
+            size = _bytes_per_delivery(data, hydrate)
+            print("  {0:<10} {1:>10,.0f} deliveries/s {2:>10,.0f} bytes/delivery".format(name, rate, size))
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from .user import *
 from .repository import *
 from .enums import *
 from .comment import *
+from .retry import *
 
 
 __version__ = "1.0.0a"
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import signal
 import traceback
 import sys
-import time
 from typing import (
     Any,
     Optional,
@@ -20,9 +20,20 @@ from typing import (
 
 import aiohttp
 
-from .http import HTTPClient, AuthInfo
-from .server import WebhookServer
+from .bulk import BulkOperation
+from .cache import ResponseCache
+from .catchup import CatchUp
+from .codec import JSONCodec, get_codec
+from .http import HTTPClient, AuthInfo, ConnectionOptions
+from .ingest import IngestQueue, RecentDeliveries
+from .prefork import Supervisor
+from .routing import Router
+from .retry import RetryPolicy
+from .server import WebhookServer, MAX_BODY_SIZE
+from .spool import DeliverySpool
 from .state import ApplicationState
+from .tasks import TaskSupervisor
+from .waiters import WaiterRegistry
 from .user import (
     ApplicationUser,
     BaseUser,
@@ -33,6 +44,10 @@ if TYPE_CHECKING:
     from .issue import Issue
     from .user import User, BaseUser
     from .installation import Installation
+    from .ratelimit import RateLimitBucket
+    from .iterators import PaginatedIterator
+    from .graphql import GraphQLLoader
+    from .metrics import HTTPMetrics
 
 
 __all__ = (
@@ -53,7 +68,31 @@ class GitBot:
         loop: Optional[asyncio.AbstractEventLoop] = None,
         session: Optional[aiohttp.ClientSession] = None,
         endpoint: Optional[str] = None,
-        apply_proxy_support: bool = False
+        apply_proxy_support: bool = False,
+        ratelimit_reserve: int = 0,
+        response_cache_size: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        connection_options: Optional[ConnectionOptions] = None,
+        graphql_batch_window: Optional[float] = None,
+        json_codec: Union[str, JSONCodec] = "auto",
+        api_base_url: Optional[str] = None,
+        max_webhook_body_size: int = MAX_BODY_SIZE,
+        ingest_workers: Optional[int] = None,
+        ingest_queue_size: int = 1000,
+        ingest_overload: str = "block",
+        ingest_spill_path: Optional[str] = None,
+        delivery_dedup_size: Optional[int] = 10000,
+        delivery_dedup_ttl: float = 3600.0,
+        spool_directory: Optional[str] = None,
+        spool_segment_size: int = 64 * 1024 * 1024,
+        spool_fsync_interval: float = 0.005,
+        catch_up_state_path: Optional[str] = None,
+        catch_up_mode: str = "fetch",
+        catch_up_concurrency: int = 5,
+        drain_timeout: float = 30.0,
+        max_concurrent_listeners: Optional[int] = None,
+        max_concurrent_listeners_per_event: Optional[int] = None,
+        max_listener_backlog: Optional[int] = None
     ):
         auth = AuthInfo(
             pem_fp=pem_file_fp,
@@ -62,8 +101,49 @@ class GitBot:
             client_id=client_id
         )
         
+        codec = get_codec(json_codec)
+
+        response_cache = None
+        if response_cache_size is not None:
+            response_cache = ResponseCache(maxsize=response_cache_size)
+
         self.loop = loop if loop is not None else asyncio.get_event_loop()
-        self.http = HTTPClient(auth, loop=self.loop, session=session)
+        self.http = HTTPClient(
+            auth,
+            loop=self.loop,
+            session=session,
+            ratelimit_reserve=ratelimit_reserve,
+            response_cache=response_cache,
+            retry_policy=retry_policy,
+            connection_options=connection_options,
+            codec=codec,
+            base_url=api_base_url
+        )
+
+        self._graphql_batch_window = graphql_batch_window
+
+        ingest = None
+        if ingest_workers is not None:
+            ingest = IngestQueue(
+                workers=ingest_workers,
+                maxsize=ingest_queue_size,
+                overload=ingest_overload,
+                spill_path=ingest_spill_path,
+                codec=codec
+            )
+
+        recent_deliveries = None
+        if delivery_dedup_size is not None:
+            recent_deliveries = RecentDeliveries(maxsize=delivery_dedup_size, ttl=delivery_dedup_ttl)
+
+        spool = None
+        if spool_directory is not None:
+            spool = DeliverySpool(
+                spool_directory,
+                segment_size=spool_segment_size,
+                fsync_interval=spool_fsync_interval,
+                codec=codec
+            )
 
         _endpoint = endpoint or "/gitbot-interaction-receive"
         __state = ApplicationState(self)
@@ -71,13 +151,41 @@ class GitBot:
             webhook_secret=webhook_secret,
             endpoint=_endpoint,
             state=__state,
-            behind_proxy=apply_proxy_support
+            behind_proxy=apply_proxy_support,
+            codec=codec,
+            max_body_size=max_webhook_body_size,
+            ingest=ingest,
+            recent_deliveries=recent_deliveries,
+            spool=spool
         )
+        self._router = Router(self)
+        self.server.router = self._router
+
+        self._catch_up: Optional[CatchUp] = None
+        if catch_up_state_path is not None:
+            self._catch_up = CatchUp(
+                self.http,
+                self.server,
+                state_path=catch_up_state_path,
+                mode=catch_up_mode,
+                concurrency=catch_up_concurrency
+            )
 
         self._state = __state
         self._closed = False
         self._done_ev = asyncio.Event()
+        self._tasks = TaskSupervisor(
+            on_error=self._on_listener_error,
+            max_concurrency=max_concurrent_listeners,
+            max_per_event=max_concurrent_listeners_per_event,
+            max_backlog=max_listener_backlog
+        )
+        self._waiters = WaiterRegistry()
+        self.drain_timeout = drain_timeout
+        self.drain_report: Optional[Dict[str, Any]] = None
+        self._close_task: Optional[asyncio.Future] = None
         self.__listeners: Dict[str, List[Awaitable]] = {}
+        self.__listener_names: Dict[str, str] = {} # event name -> "on_" + event name.
 
     async def start(
         self,
@@ -98,17 +206,40 @@ class GitBot:
         await server._run(host=host, port=port, dispatch=self.dispatch)
         _log.info(f"TCP server is now online at: http://{host}:{port}")
 
+        if self._catch_up is not None:
+            # after the server is up, so redeliveries have somewhere to land.
+            await self._catch_up.run()
+
     def run(
         self,
         *,
         host: str = "0.0.0.0",
-        port: int = 8000
+        port: int = 8000,
+        workers: int = 1,
+        drain_timeout: Optional[float] = None
     ):
+        if drain_timeout is not None:
+            self.drain_timeout = drain_timeout
+
+        if workers > 1:
+            # each worker forks off this process, so listeners registered so far come along.
+            supervisor = Supervisor(
+                functools.partial(self._run_worker, host=host, port=port),
+                workers=workers,
+                # a little longer than the workers' own drain, so they get to report.
+                drain_timeout=self.drain_timeout + 5
+            )
+            return supervisor.run()
+
         loop = self.loop
 
+        def stop():
+            if not self.is_closed():
+                asyncio.ensure_future(self.close(), loop=loop)
+
         try:
-            loop.add_signal_handler(signal.SIGINT, lambda: loop.stop())
-            loop.add_signal_handler(signal.SIGTERM, lambda: loop.stop())
+            loop.add_signal_handler(signal.SIGINT, stop)
+            loop.add_signal_handler(signal.SIGTERM, stop)
         except NotImplementedError:
             pass
 
@@ -120,8 +251,8 @@ class GitBot:
                     await self.close()
 
         def stop_on_completion(_):
+            # close() sets the event once everything has drained, so there is nothing left to wait for.
             loop.stop()
-            time.sleep(1) # allow for cleanup operations to occur.
 
         future = asyncio.ensure_future(runner(), loop=loop)
         future.add_done_callback(stop_on_completion)
@@ -129,51 +260,108 @@ class GitBot:
         loop.run_until_complete(self.start(host=host, port=port))
         loop.run_forever()
 
-    async def close(self):
-        self._done_ev.set()
+    def _run_worker(self, index: int, *, host: str, port: int):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = self.http.loop = loop
+        # nothing asyncio made before the fork may be used with this loop.
+        self.http._reset_loop_state()
+        self.server._idle = None
+        self._done_ev = asyncio.Event()
+        self.server._use_worker(index)
+        if index != 0:
+            self._catch_up = None # one worker catching up is enough.
+
+        async def worker():
+            stopping = asyncio.Event()
+            loop.add_signal_handler(signal.SIGTERM, stopping.set)
+
+            await self.start(host=host, port=port)
+            _log.info("Worker %d is serving." % index)
+
+            waiters = [asyncio.ensure_future(stopping.wait()), asyncio.ensure_future(self._done_ev.wait())]
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+
+            if not self.is_closed():
+                await self.close()
+
+        try:
+            loop.run_until_complete(worker())
+        finally:
+            loop.close()
+
+    async def close(self, *, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Stops accepting deliveries and drains in-flight work before shutting down.
+
+        Deliveries already accepted and the listener tasks they started get up
+        to ``timeout`` seconds (``drain_timeout`` by default) to finish. Anything
+        still running after that is cancelled, and listed in the returned report.
+        Later calls, such as a second signal, wait for the same shutdown.
+        """
+        if self._close_task is None:
+            self._close_task = asyncio.ensure_future(self._close(timeout))
+        # shielded, so a cancelled caller doesn't cut the shutdown short for everyone.
+        return await asyncio.shield(self._close_task)
+
+    async def _close(self, timeout: Optional[float]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        timeout = self.drain_timeout if timeout is None else timeout
+        started = loop.time()
+
+        report = await self.server.drain(timeout)
+        # nothing will be dispatched anymore, so listeners in wait_for() shouldn't hold up the drain.
+        self._waiters.cancel_all()
+
+        cancelled = []
+        if not await self._tasks.wait(max(started + timeout - loop.time(), 0)):
+            cancelled = await self._tasks.cancel_all()
+        report["cancelled_listeners"] = sorted(cancelled)
+
         await self.server.cleanup()
+        if self._state._loader is not None:
+            await self._state._loader.close()
         await self.http.close()
+
+        report["elapsed"] = loop.time() - started
+        report["clean"] = not (report["inflight_requests"] or report["unfinished_deliveries"] or cancelled)
+        if not report["clean"]:
+            _log.warning("Shutdown cut off work after %.1fs: %r" % (report["elapsed"], report))
+
+        self.drain_report = report
         self._closed = True
+        self._done_ev.set()
+        return report
 
     def is_closed(self) -> bool:
         return self._closed
 
-    async def _run_event(
-        self,
-        coro: Callable[..., Coroutine[Any, Any, Any]],
-        event: str,
-        *args: Any,
-        **kwargs: Any
-    ):
-        try:
-            await coro(*args, **kwargs)
-        except asyncio.CancelledError:
-            pass
-        except Exception:
-            try:
-                await self.on_internal_error(event, *args, **kwargs)
-            except asyncio.CancelledError:
-                pass
+    async def _on_listener_error(self, event: str, *args: Any, **kwargs: Any):
+        # looked up on each call, since attach_new_error_callback swaps it out.
+        await self.on_internal_error(event, *args, **kwargs)
 
     def _schedule_event(
         self,
         coro: Callable[..., Coroutine[Any, Any, Any]],
         event: str,
-        idx: int,
         *args: Any,
         **kwargs: Any
-    ):
-        wrapped = self._run_event(coro, event, *args, **kwargs)
-        asyncio.create_task(wrapped, name=f"sapid: {event}: {idx}")
-        
+    ) -> Optional[asyncio.Task]:
+        return self._tasks.spawn(event, coro, *args, **kwargs)
+
     def dispatch(self, event_name: str, *args, **kwargs):
         _log.debug("Dispatching event %s" % event_name)
 
-        listener_name = "on_" + event_name
-        listeners = self.__listeners.get(listener_name, [])
+        try:
+            listener_name = self.__listener_names[event_name]
+        except KeyError:
+            listener_name = self.__listener_names[event_name] = "on_" + event_name
+        listeners = self.__listeners.get(listener_name, ())
 
-        for i, callback in enumerate(listeners):
-            self._schedule_event(callback, event_name, i, *args, **kwargs)
+        self._waiters.resolve(event_name, args, kwargs)
+        for callback in listeners:
+            self._schedule_event(callback, event_name, *args, **kwargs)
 
     def add_listener(self, event_name: str, callback: Awaitable):
         if not asyncio.iscoroutinefunction(callback):
@@ -185,6 +373,44 @@ class GitBot:
         current_listeners.append(callback)
 
         self.__listeners[event_name] = current_listeners
+        self._router.invalidate()
+
+    async def wait_for(
+        self,
+        event: str,
+        *,
+        check: Optional[Callable[..., bool]] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Waits for the next dispatch of ``event`` whose arguments pass ``check``.
+
+        Returns the dispatched argument, or a tuple of them if there are
+        several. Raises :class:`asyncio.TimeoutError` after ``timeout`` seconds.
+        The waiter is registered when this starts running, so to catch an
+        event you are about to cause, start it as a task first.
+
+        Waiters are indexed by event name only. A dispatch of ``event`` runs
+        the check of every waiter still waiting for it, but never looks at
+        waiters for other events or ones that are already done.
+        """
+        event = event.lower()
+        if not self._has_listener(event):
+            # the router may have compiled this event away for having no listeners.
+            self._router.invalidate()
+
+        future = self._waiters.add(event, check)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiters.remove(event, future)
+
+    def _has_listener(self, event_name: str) -> bool:
+        return bool(self.__listeners.get("on_" + event_name)) or self._waiters.has(event_name)
+
+    def _listener_names(self) -> List[str]:
+        names = [name for name, listeners in self.__listeners.items() if listeners]
+        names.extend("on_" + event for event in self._waiters.events())
+        return names
 
     async def on_internal_error(self, event: str, *args: Any, **kwargs: Any) -> None:
         print(f'Ignoring exception in {event}', file=sys.stderr)
@@ -206,6 +432,34 @@ class GitBot:
     def user(self) -> ApplicationUser:
         return self._state._user
 
+    @property
+    def loader(self) -> Optional[GraphQLLoader]:
+        return self._state._loader
+
+    @property
+    def metrics(self) -> HTTPMetrics:
+        return self.http.metrics
+
+    @property
+    def router(self) -> Router:
+        return self._router
+
+    @property
+    def tasks(self) -> TaskSupervisor:
+        return self._tasks
+
+    @property
+    def waiters(self) -> WaiterRegistry:
+        return self._waiters
+
+    @property
+    def ingest(self) -> Optional[IngestQueue]:
+        return self.server.ingest
+
+    @property
+    def ratelimits(self) -> List[RateLimitBucket]:
+        return self.http.ratelimits
+
     @property
     def cached_issues(self) -> List[Issue]:
         return list(self._state._issues.values())
@@ -218,6 +472,25 @@ class GitBot:
     def cached_installations(self) -> List[Installation]:
         return list(self._state._installations.values())
     
+    def bulk(
+        self,
+        *,
+        concurrency: int = 10,
+        per_installation: int = 3,
+        content_rate: int = 80,
+        content_period: float = 60.0
+    ) -> BulkOperation:
+        return BulkOperation(
+            self._state,
+            concurrency=concurrency,
+            per_installation=per_installation,
+            content_rate=content_rate,
+            content_period=content_period
+        )
+
+    def installations(self, *, prefetch: bool = True) -> PaginatedIterator[Installation]:
+        return self._state.installations(prefetch=prefetch)
+
     def get_user(self, id: int, /) -> Optional[Union[BaseUser, User]]:
         user = self._state.get_user(id)
         return user
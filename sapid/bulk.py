@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple
+)
+
+if TYPE_CHECKING:
+    from .state import ApplicationState
+    from .issue import Issue
+    from .enums import IssueLockReason
+
+
+__all__ = (
+    "BulkResult",
+    "BulkOperation",
+)
+
+_log = logging.getLogger(__name__)
+
+class BulkResult:
+    """The outcome of one item of a bulk operation."""
+
+    __slots__ = ("item", "result", "error")
+
+    def __init__(self, item: Any, *, result: Any = None, error: Optional[BaseException] = None):
+        self.item = item
+        self.result = result
+        self.error = error
+
+    def __repr__(self) -> str:
+        fmt = "<BulkResult item={0.item!r} ok={0.ok!r} error={0.error!r}>"
+        return fmt.format(self)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class _Pacer:
+    # a sliding window limiter: at most `rate` starts in any `per` seconds.
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self._starts: Deque[float] = deque()
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            starts = self._starts
+            while len(starts) >= self.rate:
+                elapsed = loop.time() - starts[0]
+                if elapsed >= self.per:
+                    starts.popleft()
+                else:
+                    await asyncio.sleep(self.per - elapsed)
+            starts.append(loop.time())
+
+class BulkOperation:
+    """Runs the same write against many issues.
+
+    Work is grouped by installation. Each installation gets at most
+    ``per_installation`` concurrent writes, and ``concurrency`` caps the total.
+    Content creating writes (comments and labels) are also paced to
+    ``content_rate`` per ``content_period`` seconds per installation, to stay
+    under GitHub's secondary rate limits.
+
+    Failures never abort the batch. Every method returns one :class:`BulkResult`
+    per item, in the order the items were given.
+    """
+    def __init__(
+        self,
+        state: ApplicationState,
+        *,
+        concurrency: int = 10,
+        per_installation: int = 3,
+        content_rate: int = 80,
+        content_period: float = 60.0
+    ):
+        self._state = state
+        self.concurrency = concurrency
+        self.per_installation = per_installation
+        self.content_rate = content_rate
+        self.content_period = content_period
+
+        # shared by every BulkOperation, so pacing holds across calls to GitBot.bulk().
+        # keyed by (installation id, rate, period), so each operation gets the pacing it asked for.
+        self._pacers: Dict[Tuple[int, int, float], _Pacer] = state._content_pacers
+
+    async def comment(self, issues: Iterable[Issue], body: str) -> List[BulkResult]:
+        return await self._run(issues, lambda issue: issue.create_comment(body), creates_content=True)
+
+    async def add_labels(self, issues: Iterable[Issue], labels: List[str]) -> List[BulkResult]:
+        return await self._run(issues, lambda issue: issue.add_labels(labels), creates_content=True)
+
+    async def lock(self, issues: Iterable[Issue], *, reason: Optional[IssueLockReason] = None) -> List[BulkResult]:
+        return await self._run(issues, lambda issue: issue.lock(reason=reason), creates_content=False)
+
+    async def unlock(self, issues: Iterable[Issue]) -> List[BulkResult]:
+        return await self._run(issues, lambda issue: issue.unlock(), creates_content=False)
+
+    def _pacer_for(self, installation_id: int) -> _Pacer:
+        key = (installation_id, self.content_rate, self.content_period)
+        try:
+            return self._pacers[key]
+        except KeyError:
+            pacer = self._pacers[key] = _Pacer(self.content_rate, self.content_period)
+            return pacer
+
+    async def _run(
+        self,
+        issues: Iterable[Issue],
+        func: Callable[[Issue], Awaitable[Any]],
+        *,
+        creates_content: bool
+    ) -> List[BulkResult]:
+        issues = list(issues)
+        results = [BulkResult(issue) for issue in issues]
+        tokens = self._state._http.tokens
+
+        # resolve installations up front, so each group can share one token fetch.
+        installation_ids = await asyncio.gather(
+            *(issue.repository._fetch_installation_id() for issue in issues),
+            return_exceptions=True
+        )
+        groups: Dict[int, List[int]] = {}
+        for index, installation_id in enumerate(installation_ids):
+            if isinstance(installation_id, BaseException):
+                results[index].error = installation_id
+            else:
+                groups.setdefault(installation_id, []).append(index)
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(index: int, installation_limit: asyncio.Semaphore, pacer: Optional[_Pacer]):
+            async with installation_limit:
+                # paced before taking a global slot, so a throttled installation doesn't hold others up.
+                if pacer is not None:
+                    await pacer.wait()
+                async with limit:
+                    try:
+                        results[index].result = await func(issues[index])
+                    except Exception as exc:
+                        results[index].error = exc
+
+        async def run_group(installation_id: int, indexes: List[int]):
+            try:
+                await tokens.get(installation_id)
+            except Exception as exc:
+                for index in indexes:
+                    results[index].error = exc
+                return
+
+            installation_limit = asyncio.Semaphore(self.per_installation)
+            pacer = self._pacer_for(installation_id) if creates_content else None
+            await asyncio.gather(*(run_one(index, installation_limit, pacer) for index in indexes))
+
+        await asyncio.gather(*(run_group(installation_id, indexes) for installation_id, indexes in groups.items()))
+
+        failed = sum(1 for result in results if not result.ok)
+        if failed:
+            _log.warning("%d of %d bulk writes failed." % (failed, len(results)))
+        return results
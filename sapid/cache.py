@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Mapping,
+    Optional,
+    Tuple
+)
+
+
+__all__ = (
+    "CachedResponse",
+    "ResponseCache",
+)
+
+class CachedResponse:
+    """A GET response body, along with the validators GitHub sent for it."""
+
+    if TYPE_CHECKING:
+        etag: Optional[str]
+        last_modified: Optional[str]
+        data: Any
+        headers: Mapping[str, str]
+
+    __slots__ = ("etag", "last_modified", "data", "headers")
+
+    def __init__(self, *, etag: Optional[str], last_modified: Optional[str], data: Any, headers: Mapping[str, str]):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.data = data
+        self.headers = headers
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """A bounded LRU cache of GET responses, keyed by ``(identity, url)``.
+
+    Cached entries are revalidated with ``If-None-Match`` / ``If-Modified-Since``.
+    A ``304 Not Modified`` serves the cached body, and GitHub doesn't count it
+    against the rate limit.
+    """
+    def __init__(self, maxsize: int = 1024):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0.")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Tuple[str, str], CachedResponse] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        fmt = "<ResponseCache size={0} maxsize={1.maxsize!r} hits={1.hits!r} misses={1.misses!r}>"
+        return fmt.format(len(self), self)
+
+    def get(self, identity: str, url: str) -> Optional[CachedResponse]:
+        key = (identity, url)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(
+        self,
+        identity: str,
+        url: str,
+        *,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        data: Any,
+        headers: Mapping[str, str]
+    ):
+        if etag is None and last_modified is None:
+            return # nothing to revalidate with.
+
+        key = (identity, url)
+        self._entries[key] = CachedResponse(etag=etag, last_modified=last_modified, data=data, headers=headers)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, identity: str, url: str):
+        self._entries.pop((identity, url), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
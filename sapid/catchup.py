@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional
+)
+
+from .ingest import Delivery
+
+if TYPE_CHECKING:
+    from .http import HTTPClient
+    from .server import WebhookServer
+
+
+__all__ = (
+    "CatchUp",
+)
+
+_log = logging.getLogger(__name__)
+
+CATCH_UP_MODES = ("fetch", "redeliver")
+
+def _parse_timestamp(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=datetime.timezone.utc)
+
+class CatchUp:
+    """Recovers webhook deliveries that failed while the bot was down.
+
+    The app's delivery log is paged newest first, back to the last delivery id
+    seen by the previous run, which is kept in the JSON file at ``state_path``.
+    A delivery whose attempts all failed is either fetched and fed through the
+    server (``"fetch"``), or handed back to GitHub to send again
+    (``"redeliver"``), ``concurrency`` at a time.
+
+    The first run only records where the log currently ends, so old history
+    isn't replayed. Deliveries older than ``max_age`` seconds are ignored.
+    """
+    def __init__(
+        self,
+        http: HTTPClient,
+        server: WebhookServer,
+        *,
+        state_path: str,
+        mode: str = "fetch",
+        concurrency: int = 5,
+        max_age: float = 3 * 24 * 60 * 60.0
+    ):
+        if mode not in CATCH_UP_MODES:
+            raise ValueError("mode must be one of {0}, not {1!r}.".format(", ".join(CATCH_UP_MODES), mode))
+
+        self._http = http
+        self._server = server
+        self.state_path = state_path
+        self.mode = mode
+        self.concurrency = concurrency
+        self.max_age = max_age
+
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Optional[int]:
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)["last_delivery_id"]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError):
+            _log.warning("Ignoring an unreadable catch-up state file at %s." % self.state_path)
+            return None
+
+    def _save(self, last_delivery_id: int):
+        # written to the side and swapped in, so a crash never leaves half a file.
+        temp = self.state_path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"last_delivery_id": last_delivery_id}, f)
+        os.replace(temp, self.state_path)
+
+    async def _scan(self, last: int) -> Dict[str, Any]:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.max_age)
+        newest = None
+        scanned = 0
+        succeeded = set()
+        failed: Dict[str, Dict[str, Any]] = {} # guid -> its newest failed attempt.
+
+        iterator = self._http.iter_hook_deliveries()
+        try:
+            async for item in iterator:
+                if newest is None:
+                    newest = item["id"]
+                if item["id"] <= last or _parse_timestamp(item["delivered_at"]) < cutoff:
+                    break
+
+                scanned += 1
+                guid = item["guid"]
+                if 200 <= item["status_code"] < 300:
+                    succeeded.add(guid)
+                elif guid not in failed:
+                    failed[guid] = item
+        finally:
+            await iterator.aclose()
+
+        missed = [item for guid, item in failed.items() if guid not in succeeded]
+        missed.sort(key=lambda item: item["id"]) # log order, so the saved pointer only moves forward.
+        return {"newest": newest, "scanned": scanned, "missed": missed}
+
+    async def _recover(self, item: Dict[str, Any]) -> Optional[Delivery]:
+        if self.mode == "redeliver":
+            await self._http.redeliver_hook_delivery(item["id"])
+            return None
+
+        data = await self._http.fetch_hook_delivery(item["id"])
+        request = data["request"]
+        headers = dict(request.get("headers") or {})
+        headers["X-GitHub-Event"] = data["event"]
+        headers["X-GitHub-Delivery"] = data["guid"]
+        headers["Content-Type"] = "application/json"
+        body = self._server._codec.dumps(request["payload"])
+        return Delivery(headers, body)
+
+    async def _start_state(self):
+        iterator = self._http.iter_hook_deliveries()
+        try:
+            async for item in iterator:
+                self._save(item["id"])
+                break
+        finally:
+            await iterator.aclose()
+        _log.info("No catch-up state yet, starting from the newest delivery.")
+
+    async def run(self) -> Dict[str, Any]:
+        report = {"scanned": 0, "missed": 0, "recovered": 0, "duplicates": 0, "errors": 0}
+        self.last_report = report
+
+        last = self._load()
+        try:
+            if last is None:
+                await self._start_state()
+                return report
+            scan = await self._scan(last)
+        except Exception as exc:
+            # the bot still starts, and the next run scans from the same place.
+            _log.warning("Could not read the app's delivery log, skipping catch-up: %r" % exc)
+            report["errors"] += 1
+            return report
+
+        missed: List[Dict[str, Any]] = scan["missed"]
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def recover(item: Dict[str, Any]):
+            async with limit:
+                return await self._recover(item)
+
+        # fetched concurrently, but fed and recorded one at a time in log order.
+        tasks = [asyncio.ensure_future(recover(item)) for item in missed]
+        try:
+            last = await self._feed_all(missed, tasks, last, report)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # the rest of the window was delivered fine the first time.
+        if not report["errors"] and scan["newest"] is not None and scan["newest"] > last:
+            self._save(scan["newest"])
+
+        report["scanned"] = scan["scanned"]
+        report["missed"] = len(missed)
+        _log.info("Caught up on %d of %d missed deliveries (%d scanned)." % (report["recovered"], len(missed), scan["scanned"]))
+        return report
+
+    async def _feed_all(self, missed: List[Dict[str, Any]], tasks: List[asyncio.Future], last: int, report: Dict[str, Any]) -> int:
+        # the pointer stops before the first delivery that couldn't be handled,
+        # so it and everything after it are looked at again next time.
+        failed = False
+        for item, task in zip(missed, tasks):
+            try:
+                result = await task
+            except Exception as exc:
+                result = exc
+
+            if result is None:
+                report["recovered"] += 1 # redelivered, it will arrive over HTTP.
+            elif not isinstance(result, BaseException):
+                try:
+                    fed = await self._server.feed(result)
+                except Exception as exc:
+                    # a shed delivery, or one whose handling raised.
+                    result = exc
+                else:
+                    report["recovered" if fed else "duplicates"] += 1
+
+            if isinstance(result, BaseException):
+                report["errors"] += 1
+                _log.warning("Could not recover delivery %s: %r" % (item["guid"], result))
+                failed = True
+            elif not failed and item["id"] > last:
+                # saved after each one, so a crash part way resumes right after it.
+                self._save(item["id"])
+                last = item["id"]
+        return last
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from typing import (
+    Any,
+    Union
+)
+
+ORJSON_EXISTS = True
+try:
+    import orjson
+except ImportError:
+    ORJSON_EXISTS = False
+
+__all__ = (
+    "JSONCodec",
+    "OrjsonCodec",
+    "get_codec",
+)
+
+class JSONCodec:
+    """Encodes and decodes JSON bodies with the standard library.
+
+    Subclasses only need to override :meth:`loads` and :meth:`dumps`.
+    Both work on ``bytes``, so bodies never take a detour through ``str``.
+    """
+    name = "json"
+
+    def __repr__(self) -> str:
+        return "<{0.__class__.__name__} name={0.name!r}>".format(self)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        if not ORJSON_EXISTS:
+            raise ValueError("orjson is not installed. Please install it, or use the json codec instead.")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+def get_codec(codec: Union[str, JSONCodec] = "auto") -> JSONCodec:
+    if isinstance(codec, JSONCodec):
+        return codec
+
+    if codec == "auto":
+        return OrjsonCodec() if ORJSON_EXISTS else JSONCodec()
+    if codec == "orjson":
+        return OrjsonCodec()
+    if codec == "json":
+        return JSONCodec()
+
+    raise ValueError("Unknown JSON codec {!r}. Expected 'auto', 'orjson', 'json' or a JSONCodec instance.".format(codec))
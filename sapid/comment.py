@@ -4,8 +4,8 @@ from typing import (
     TYPE_CHECKING
 )
 
-from .user import BaseUser
-from .utils import Cacheable, parse_to_dt
+from .user import BaseUser, _user_field
+from .utils import Cacheable, lazy_field, set_payload, _dt_field
 
 if TYPE_CHECKING:
     from .issue import Issue
@@ -40,17 +40,21 @@ class Comment(Cacheable):
         fmt = "<Comment id={0.id!r} author={0.author!r}>"
         return fmt.format(self)
     
-    def _update(self, data: IssuePayload, issue: IssuePayload):
-        self.id = data["id"]
-        self.node_id = data["node_id"]
-        self.url = data["url"]
-        self.html_url = data["html_url"]
-        self.body = data["body"]
-        self.user = BaseUser(state=self._state, data=data["user"])
-        self.author = self.user # a more understandable attribute.
-        self.created_at = parse_to_dt(data["created_at"])
-        self.updated_at = parse_to_dt(data["updated_at"])
-        self.issue_url = data["issue_url"]
-        self.author_association = data["author_association"]
+    def _update(self, data: IssuePayload, issue: Issue):
+        set_payload(self, data)
         self.issue = issue
 
+    id = lazy_field()
+    node_id = lazy_field()
+    url = lazy_field()
+    html_url = lazy_field()
+    body = lazy_field()
+    user = lazy_field(convert=_user_field)
+    created_at = lazy_field(convert=_dt_field)
+    updated_at = lazy_field(convert=_dt_field)
+    issue_url = lazy_field()
+    author_association = lazy_field()
+
+    @property
+    def author(self) -> BaseUser:
+        return self.user # a more understandable attribute.
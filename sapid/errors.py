@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List
+)
 
 if TYPE_CHECKING:
     from aiohttp import ClientResponse
@@ -21,4 +26,20 @@ class HTTPException(SapidException):
         docs = self.data.get("documentation_url", "unspecified")
         
         fmt = "{code}: {reason}: {msg}: {docs}"
-        return fmt.format(reason=reason, code=code, msg=msg, docs=docs)
\ No newline at end of file
+        return fmt.format(reason=reason, code=code, msg=msg, docs=docs)
+
+class GraphQLException(SapidException):
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+
+    def __str__(self) -> str:
+        messages = [error.get("message", "No Message") for error in self.errors]
+        return "; ".join(messages)
+
+class DeliveryShed(SapidException):
+    """Raised when a delivery is turned away because the ingest queue is full."""
+    def __init__(self, delivery_id: str):
+        self.delivery_id = delivery_id
+
+    def __str__(self) -> str:
+        return "Delivery {0} was shed, the ingest queue is full.".format(self.delivery_id)
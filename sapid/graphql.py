@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+from .user import BaseUser
+from .issue import Issue
+from .comment import Comment
+from .errors import GraphQLException
+
+if TYPE_CHECKING:
+    from .state import ApplicationState
+    from .repository import Repository
+
+
+__all__ = (
+    "GraphQLLoader",
+)
+
+_log = logging.getLogger(__name__)
+
+API_BASE = "https://api.github.com"
+
+ACTOR_FRAGMENT = """
+fragment ActorFields on Actor {
+  __typename login avatarUrl url
+  ... on User { id databaseId isSiteAdmin }
+  ... on Bot { id databaseId }
+  ... on Organization { id databaseId }
+  ... on Mannequin { id databaseId }
+}
+"""
+
+ISSUE_FRAGMENT = """
+fragment IssueFields on Issue {
+  id databaseId number title body url state locked
+  createdAt updatedAt closedAt authorAssociation
+  author { ...ActorFields }
+  assignees(first: 10) { nodes { ...ActorFields } }
+  labels(first: 20) { nodes { name color description } }
+  comments { totalCount }
+  reactions { totalCount }
+}
+"""
+
+COMMENT_FRAGMENT = """
+fragment CommentFields on IssueComment {
+  id databaseId url body createdAt updatedAt authorAssociation
+  author { ...ActorFields }
+}
+"""
+
+# the REST models are built from REST shaped payloads,
+# so GraphQL nodes are translated into that shape first.
+
+def _user_payload(node: Dict[str, Any]) -> Dict[str, Any]:
+    login = node["login"]
+    api = API_BASE + "/users/" + login
+    return {
+        "login": login,
+        "id": node.get("databaseId"),
+        "node_id": node.get("id"),
+        "avatar_url": node["avatarUrl"],
+        "url": api,
+        "html_url": node["url"],
+        "followers_url": api + "/followers",
+        "following_url": api + "/following{/other_user}",
+        "gists_url": api + "/gists{/gist_id}",
+        "starred_url": api + "/starred{/owner}{/repo}",
+        "subscriptions_url": api + "/subscriptions",
+        "organizations_url": api + "/orgs",
+        "repos_url": api + "/repos",
+        "events_url": api + "/events{/privacy}",
+        "received_events_url": api + "/received_events",
+        "type": node["__typename"],
+        "site_admin": node.get("isSiteAdmin", False)
+    }
+
+def _issue_payload(repository: Repository, node: Dict[str, Any]) -> Dict[str, Any]:
+    repo_api = "{0}/repos/{1}".format(API_BASE, repository.full_name)
+    api = "{0}/issues/{1}".format(repo_api, node["number"])
+    assignees = [_user_payload(user) for user in node["assignees"]["nodes"]]
+    author = node.get("author")
+    return {
+        "url": api,
+        "repository_url": repo_api,
+        "labels_url": api + "/labels{/name}",
+        "comments_url": api + "/comments",
+        "events_url": api + "/events",
+        "html_url": node["url"],
+        "id": node["databaseId"],
+        "node_id": node["id"],
+        "number": node["number"],
+        "title": node["title"],
+        "user": _user_payload(author) if author is not None else None,
+        "labels": node["labels"]["nodes"],
+        "state": node["state"].lower(),
+        "locked": node["locked"],
+        "assignee": assignees[0] if assignees else None,
+        "assignees": assignees,
+        "comments": node["comments"]["totalCount"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "closed_at": node["closedAt"],
+        "author_association": node["authorAssociation"],
+        "body": node["body"],
+        "reactions": {
+            "url": api + "/reactions",
+            "total_count": node["reactions"]["totalCount"]
+        },
+        "timeline_url": api + "/timeline",
+        "performed_via_github_app": None
+    }
+
+def _comment_payload(issue: Issue, node: Dict[str, Any]) -> Dict[str, Any]:
+    repo_api = "{0}/repos/{1}".format(API_BASE, issue.repository.full_name)
+    author = node.get("author")
+    return {
+        "id": node["databaseId"],
+        "node_id": node["id"],
+        "url": "{0}/issues/comments/{1}".format(repo_api, node["databaseId"]),
+        "html_url": node["url"],
+        "body": node["body"],
+        "user": _user_payload(author) if author is not None else None,
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "issue_url": issue.url,
+        "author_association": node["authorAssociation"]
+    }
+
+class _Lookup:
+    __slots__ = ("key", "selection", "variables", "fragments", "resolve", "future")
+
+    def __init__(
+        self,
+        key: Tuple[Any, ...],
+        selection: str,
+        variables: Dict[str, Tuple[str, Any]],
+        fragments: Tuple[str, ...],
+        resolve: Callable[[Any], Any]
+    ):
+        self.key = key
+        # the selection uses {alias} and ${variable} placeholders, which are filled in per batch.
+        self.selection = selection
+        self.variables = variables
+        self.fragments = fragments
+        self.resolve = resolve
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class GraphQLLoader:
+    """Folds lookups made within ``window`` seconds into aliased GraphQL queries.
+
+    Lookups are grouped per installation, since each query is sent with that
+    installation's access token. Identical lookups in the same batch share a
+    single result. The query cost GitHub reports is tracked in :attr:`total_cost`.
+    """
+    def __init__(self, state: ApplicationState, *, window: float = 0.005, max_batch_size: int = 50):
+        self._state = state
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self._pending: Dict[int, Dict[Tuple[Any, ...], _Lookup]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set() # batches being sent.
+
+        self.queries = 0
+        self.lookups = 0
+        self.total_cost = 0
+        self.last_ratelimit: Optional[Dict[str, Any]] = None
+
+    async def load_issue(self, repository: Repository, number: int) -> Issue:
+        installation_id = await repository._fetch_installation_id()
+        lookup = _Lookup(
+            key=("issue", repository.full_name, number),
+            selection="{alias}: repository(owner: ${owner}, name: ${name}) { issue(number: ${number}) { ...IssueFields } }",
+            variables={
+                "owner": ("String!", repository.owner.login),
+                "name": ("String!", repository.name),
+                "number": ("Int!", int(number))
+            },
+            fragments=(ACTOR_FRAGMENT, ISSUE_FRAGMENT),
+            resolve=lambda data: None if data["issue"] is None else Issue(
+                state=self._state,
+                data=_issue_payload(repository, data["issue"]),
+                repository=repository
+            )
+        )
+        return await self._enqueue(installation_id, lookup)
+
+    async def load_comment(self, issue: Issue, node_id: str) -> Comment:
+        installation_id = await issue.repository._fetch_installation_id()
+        lookup = _Lookup(
+            key=("node", node_id),
+            selection="{alias}: node(id: ${id}) { ...CommentFields }",
+            variables={
+                "id": ("ID!", node_id)
+            },
+            fragments=(ACTOR_FRAGMENT, COMMENT_FRAGMENT),
+            # anything other than an IssueComment matches no fields of the fragment.
+            resolve=lambda data: None if not data else Comment(state=self._state, data=_comment_payload(issue, data), issue=issue)
+        )
+        return await self._enqueue(installation_id, lookup)
+
+    async def load_user(self, login: str, *, installation_id: int) -> BaseUser:
+        lookup = _Lookup(
+            key=("user", login),
+            selection="{alias}: repositoryOwner(login: ${login}) { ...ActorFields }",
+            variables={
+                "login": ("String!", login)
+            },
+            fragments=(ACTOR_FRAGMENT,),
+            resolve=lambda data: None if not data else BaseUser(state=self._state, data=_user_payload(data))
+        )
+        return await self._enqueue(installation_id, lookup)
+
+    def _enqueue(self, installation_id: int, lookup: _Lookup) -> Awaitable[Any]:
+        self.lookups += 1
+        pending = self._pending.setdefault(installation_id, {})
+
+        existing = pending.get(lookup.key)
+        if existing is not None:
+            return asyncio.shield(existing.future)
+
+        pending[lookup.key] = lookup
+        if len(pending) >= self.max_batch_size:
+            self._flush(installation_id)
+        elif installation_id not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[installation_id] = loop.call_later(self.window, self._flush, installation_id)
+
+        return asyncio.shield(lookup.future)
+
+    def _flush(self, installation_id: int):
+        timer = self._timers.pop(installation_id, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = list(self._pending.pop(installation_id, {}).values())
+        if batch:
+            task = asyncio.ensure_future(self._execute(installation_id, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _build_query(self, batch: List[_Lookup]) -> Tuple[str, Dict[str, Any]]:
+        declarations = []
+        selections = []
+        variables = {}
+        fragments = []
+
+        for index, lookup in enumerate(batch):
+            names = {}
+            for name, (type_, value) in lookup.variables.items():
+                var_name = "{0}{1}".format(name, index)
+                names[name] = var_name
+                declarations.append("${0}: {1}".format(var_name, type_))
+                variables[var_name] = value
+
+            selection = lookup.selection.replace("{alias}", "q{0}".format(index))
+            for name, var_name in names.items():
+                selection = selection.replace("${" + name + "}", "$" + var_name)
+            selections.append(selection)
+
+            for fragment in lookup.fragments:
+                if fragment not in fragments:
+                    fragments.append(fragment)
+
+        selections.append("rateLimit { cost limit remaining resetAt }")
+        query = "query({0}) {{ {1} }}".format(", ".join(declarations), " ".join(selections))
+        return query + "".join(fragments), variables
+
+    async def _execute(self, installation_id: int, batch: List[_Lookup]):
+        try:
+            token = await self._state._http.tokens.get(installation_id)
+            query, variables = self._build_query(batch)
+            response = await self._state._http.graphql(query, token.token, variables=variables)
+        except asyncio.CancelledError:
+            for lookup in batch:
+                lookup.future.cancel()
+            raise
+        except Exception as exc:
+            for lookup in batch:
+                if not lookup.future.done():
+                    lookup.future.set_exception(exc)
+            return
+
+        self.queries += 1
+        data = response.get("data") or {}
+        ratelimit = data.get("rateLimit")
+        if ratelimit is not None:
+            self.last_ratelimit = ratelimit
+            self.total_cost += ratelimit["cost"]
+
+        errors: Dict[str, List[Dict[str, Any]]] = {}
+        for error in response.get("errors", []):
+            path = error.get("path") or ["*"]
+            errors.setdefault(path[0], []).append(error)
+
+        _log.debug("Resolved %d lookups for installation %s in one GraphQL query." % (len(batch), installation_id))
+
+        for index, lookup in enumerate(batch):
+            alias = "q{0}".format(index)
+            node = data.get(alias)
+            try:
+                result = lookup.resolve(node) if node is not None else None
+                if result is None:
+                    raise GraphQLException(errors.get(alias) or errors.get("*") or [{"message": "Not Found"}])
+            except Exception as exc:
+                lookup.future.set_exception(exc)
+            else:
+                lookup.future.set_result(result)
+
+    async def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+        for pending in self._pending.values():
+            for lookup in pending.values():
+                lookup.future.cancel()
+        self._pending.clear()
+
+        # batches already sent are cut off too, which cancels their lookups.
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
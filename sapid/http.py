@@ -1,35 +1,78 @@
 import asyncio
+import contextlib
+import copy
+import hashlib
 import logging
-import json
+import os
 import time
 import sys
 from typing import (
+    Awaitable,
+    BinaryIO,
+    Callable,
     Optional,
     Dict,
     Union,
     Any,
-    List
+    List,
+    Mapping,
+    Tuple
 )
+from urllib.parse import urlencode
 
 import aiohttp
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
 
 from .utils import generate_jwt
 from .enums import IssueLockReason
 from .errors import HTTPException
+from .cache import ResponseCache
+from .codec import JSONCodec, get_codec
+from .ratelimit import RateLimiter, RateLimitBucket
+from .retry import RetryPolicy
+from .tokens import TokenManager
+from .iterators import PaginatedIterator
+from .metrics import HTTPMetrics
 
 
 _log = logging.getLogger(__name__)
 
-async def json_or_text(response: aiohttp.ClientResponse) -> Union[Dict[str, Any], str]:
-    text = await response.text(encoding='utf-8')
+DownloadDestination = Union[str, "os.PathLike[str]", BinaryIO, Callable[[bytes], Awaitable[Any]]]
+
+def _parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    # "bytes 100-199/1000" -> (100, 1000), "bytes */1000" -> (None, 1000).
+    if not value or not value.startswith("bytes "):
+        return None, None
+    span, _, total = value[6:].partition("/")
+    start = None
+    if span != "*":
+        try:
+            start = int(span.partition("-")[0])
+        except ValueError:
+            pass
+    try:
+        size = int(total)
+    except ValueError:
+        size = None
+    return start, size
+
+def _resume_validator(headers: Mapping[str, str]) -> Optional[str]:
+    # If-Range needs a strong validator, a weak ETag won't do.
+    etag = headers.get("ETag")
+    if etag is not None and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+async def json_or_text(response: aiohttp.ClientResponse, codec: JSONCodec) -> Union[Dict[str, Any], str]:
+    body = await response.read()
     try:
         if response.headers['Content-Type'].startswith('application/json'):
-            return json.loads(text)
+            return codec.loads(body)
     except KeyError:
         # Thanks Cloudflare. Thanks discord.py :(
         pass
 
-    return text
+    return body.decode('utf-8')
 
 class Route:
     BASE = "https://api.github.com"
@@ -37,40 +80,157 @@ class Route:
         self.method = method
         self.url = self.BASE + endpoint.format(**params)
         self.endpoint = endpoint
+        self.resource = RateLimiter.resource_for(endpoint)
+        self.idempotent: Optional[bool] = None # None means decide by method.
+
+    def with_url(self, url: str) -> "Route":
+        # used when following pagination links, which are already absolute.
+        route = copy.copy(self)
+        route.url = url
+        return route
+
+    def with_query(self, **query) -> "Route":
+        separator = "&" if "?" in self.url else "?"
+        return self.with_url(self.url + separator + urlencode(query))
 
 class AuthInfo:
+    # how long before expiry we stop handing out a cached app JWT.
+    JWT_REFRESH_MARGIN = 60
+
     def __init__(self, pem_fp: str, app_id: str, client_secret: str, client_id: str):
         self.app_id = app_id
         self.client_secret = client_secret
 
-        with open(pem_fp, "r") as f:
-            text = f.read()
+        with open(pem_fp, "rb") as f:
+            pem = f.read()
 
-        self.private_key = text
+        # parsing the PEM is expensive, so it's done once here rather than per signature.
+        self.private_key = load_pem_private_key(pem, password=None)
         self.client_id = client_id
 
+        self._jwt: Optional[str] = None
+        self._jwt_expires_at = 0
+
+    def get_jwt(self) -> str:
+        epoch = int(time.time())
+        if self._jwt is not None and epoch < self._jwt_expires_at - self.JWT_REFRESH_MARGIN:
+            return self._jwt
+
+        iat = epoch - 60
+        exp = epoch + (10 * 60) # 10 minute expiry.
+        payload = {
+            "iss": self.app_id,
+            "iat": iat,
+            "exp": exp
+        }
+
+        self._jwt = generate_jwt(payload=payload, key=self.private_key, headers={})
+        self._jwt_expires_at = exp
+        return self._jwt
+
+class ConnectionOptions:
+    """Settings for the aiohttp connector and the client's concurrency limits.
+
+    ``max_concurrency`` caps in-flight requests across the whole client and
+    ``max_concurrency_per_identity`` caps them per auth identity, i.e. the
+    app JWT and each installation token. ``None`` means unbounded.
+    """
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: Optional[int] = 300,
+        total_timeout: Optional[float] = 300.0,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        max_concurrency_per_identity: Optional[int] = None
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_identity = max_concurrency_per_identity
+
+    def create_connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=self.ttl_dns_cache is not None
+        )
+
+    def create_timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=self.total_timeout,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+
 class HTTPClient:
     def __init__(
         self,
         auth_info: AuthInfo,
         *,
         loop: Optional[asyncio.AbstractEventLoop] = None,
-        session: Optional[aiohttp.ClientSession] = None
+        session: Optional[aiohttp.ClientSession] = None,
+        ratelimit_reserve: int = 0,
+        response_cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        connection_options: Optional[ConnectionOptions] = None,
+        codec: Optional[JSONCodec] = None,
+        base_url: Optional[str] = None
     ):
         from . import __version__
         self.loop = loop or asyncio.get_event_loop()
 
         self.__auth = auth_info
         self.__session = session
+        self.ratelimiter = RateLimiter(reserve=ratelimit_reserve)
+        self.tokens = TokenManager(self)
+        self.response_cache = response_cache
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.connection_options = connection_options or ConnectionOptions()
+        self.codec = codec if codec is not None else get_codec()
+        self.metrics = HTTPMetrics(self)
+        self.base_url = base_url.rstrip("/") if base_url is not None else None # for pointing the client at a stand-in API.
+
+        # semaphores are made on first use, inside the loop that runs the requests.
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._identity_limits: Dict[str, asyncio.Semaphore] = {}
+
+        self._inflight: Dict[Tuple[str, str, Optional[str], bool], asyncio.Future] = {}
+        self.coalesced_requests = 0
 
         user_agent = 'GithubApplication (https://github.com/justanotherbyte/sapid {0}) Python/{1[0]}.{1[1]} aiohttp/{2}' # taken from discord.py. Their header format is nice.
         self.user_agent = user_agent.format(__version__, sys.version_info, aiohttp.__version__)
 
     def recreate(self):
         if self.__session is None or self.__session.closed is True:
-            self.__session = aiohttp.ClientSession()
+            options = self.connection_options
+            self.__session = aiohttp.ClientSession(
+                connector=options.create_connector(),
+                timeout=options.create_timeout(),
+                trace_configs=[self.metrics.trace_config()]
+            )
+
+    def _reset_loop_state(self):
+        # for a forked worker with a new loop. anything tied to the parent's loop is dropped
+        # and made again on first use, and recreate() opens a new session.
+        self.__session = None
+        self._global_limit = None
+        self._identity_limits = {}
+        self._inflight = {}
 
     async def close(self):
+        self.tokens.close()
         if self.__session:
             if self.__session.closed is False:
                 await self.__session.close()
@@ -79,47 +239,14 @@ class HTTPClient:
         method = route.method
         url = route.url
 
-        _custom_headers = {}
-        _custom_json = {}
-        jwt = None
-
-        if "json" in kwargs:
-            _custom_json = kwargs["json"]
-
-        if "headers" in kwargs:
-            _custom_headers = kwargs["headers"]
-
-        epoch = int(time.time())
-        iat = epoch - 60
-        exp = epoch + (10 * 60) # 10 minute expiry.
-
-        _custom_json["iss"] = self.__auth.app_id
-        _custom_json["iat"] = iat
-        _custom_json["exp"] = exp
-
-        jwt = generate_jwt(
-            payload=_custom_json,
-            key=self.__auth.private_key,
-            headers=_custom_headers
-        )
-
-        if "headers" not in kwargs:
-            kwargs["headers"] = {
-                "Authorization": "Bearer {}".format(jwt),
-                "User-Agent": self.user_agent
-            }
-        else:
-            kwargs["headers"]["Authorization"] = "Bearer {}".format(jwt)
-            kwargs["headers"]["User-Agent"] = self.user_agent
+        jwt = self.__auth.get_jwt()
+        headers = kwargs.pop("headers", {})
+        headers["Authorization"] = "Bearer {}".format(jwt)
+        headers["User-Agent"] = self.user_agent
+        kwargs["headers"] = headers
 
         _log.debug("Making a %s request with JWT to %s" % (method, url))
-
-        async with self.__session.request(method, url, **kwargs) as resp:
-            data = await json_or_text(resp)
-            if resp.ok:
-                return data
-            
-            raise HTTPException(data, resp)
+        return await self._request(route, "app", **kwargs)
 
     async def request(self, route: Route, **kwargs) -> dict:
         method = route.method
@@ -143,21 +270,325 @@ class HTTPClient:
         kwargs["headers"] = headers
         
         _log.debug("Making a %s request to %s" % (method, url))
-        async with self.__session.request(method, url, **kwargs) as resp:
-            data = await json_or_text(resp)
-            if resp.ok:
-                return data
-            
-            raise HTTPException(data, resp)
+        identity = self._identity_for(headers.get("Authorization"))
+        try:
+            return await self._request(route, identity, **kwargs)
+        except HTTPException as exc:
+            if exc.response.status != 401:
+                raise
+            authorization = await self._renew_token(identity, headers.get("Authorization"))
+            if authorization is None:
+                raise
+
+        # retried once, so a token that keeps failing surfaces as the 401 it is.
+        headers["Authorization"] = authorization
+        return await self._request(route, identity, **kwargs)
+
+    async def _renew_token(self, identity: str, authorization: Optional[str]) -> Optional[str]:
+        # an installation token can be revoked or expire early, which GitHub answers with a 401.
+        # returns the Authorization header to retry with, or None if there is nothing to renew.
+        if not identity.startswith("installation:"):
+            return None
+
+        installation_id = int(identity[len("installation:"):])
+        cached = self.tokens.get_cached(installation_id)
+        # a concurrent request may already have replaced it.
+        if cached is not None and "token " + cached.token == authorization:
+            self.tokens.invalidate(installation_id)
+
+        _log.info("The access token for installation %s was rejected, retrying with a new one." % installation_id)
+        token = await self.tokens.get(installation_id)
+        return "token " + token.token
+
+    def _identity_for(self, authorization: Optional[str]) -> str:
+        if authorization is None:
+            return "anonymous"
+        if authorization.startswith("Bearer "):
+            return "client"
+
+        token = authorization.split(" ", 1)[-1]
+        installation_id = self.tokens.installation_for(token)
+        if installation_id is not None:
+            return "installation:{}".format(installation_id)
+
+        # a token we didn't mint ourselves. Never keep the token itself around as a key.
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        return "token:" + digest[:12]
+
+    async def _request(self, route: Route, identity: str, **kwargs) -> Any:
+        if self.base_url is not None and route.url.startswith(Route.BASE):
+            route = route.with_url(self.base_url + route.url[len(Route.BASE):])
+
+        if "json" in kwargs:
+            # encoded here, so the codec is used for outgoing bodies as well.
+            kwargs["data"] = self.codec.dumps(kwargs.pop("json"))
+            kwargs["headers"]["Content-Type"] = "application/json"
+
+        if route.method != "GET":
+            return await self._request_with_retries(route, identity, **kwargs)
+
+        # identical GETs that are already in flight share the same response.
+        accept = kwargs["headers"].get("Accept", kwargs["headers"].get("accept"))
+        key = (identity, route.url, accept, kwargs.get("with_headers", False))
+        try:
+            future = self._inflight[key]
+        except KeyError:
+            future = asyncio.ensure_future(self._request_with_retries(route, identity, **kwargs))
+            self._inflight[key] = future
+
+            def _remove(_):
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+            future.add_done_callback(_remove)
+        else:
+            self.coalesced_requests += 1
+            _log.debug("Coalesced a GET request to %s with one already in flight." % route.url)
+
+        return await asyncio.shield(future)
+
+    async def _request_with_retries(self, route: Route, identity: str, **kwargs) -> Any:
+        policy = self.retry_policy
+        deadline = time.monotonic() + policy.deadline
+        attempt = 0
+
+        while True:
+            try:
+                return await self._perform(route, identity, **kwargs)
+            except HTTPException as exc:
+                error = exc
+                headers = exc.response.headers
+                retry_after = headers.get("Retry-After")
+                reason = policy.retry_reason(
+                    route.method,
+                    status=exc.response.status,
+                    data=exc.data,
+                    headers=headers,
+                    idempotent=route.idempotent
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                error = exc
+                retry_after = None
+                reason = policy.retry_reason(route.method, exception=exc, idempotent=route.idempotent)
+
+            if reason is None:
+                raise error
+
+            attempt += 1
+            delay = policy.compute_delay(attempt, retry_after)
+            if attempt >= policy.max_attempts or time.monotonic() + delay > deadline:
+                policy.give_ups[reason] += 1
+                _log.warning("Giving up on %s %s after %d attempts (%s)." % (route.method, route.url, attempt, reason))
+                raise error
+
+            policy.retries[reason] += 1
+            _log.info("Retrying %s %s in %.2f seconds (%s)." % (route.method, route.url, delay, reason))
+            await asyncio.sleep(delay)
+
+    async def _perform(self, route: Route, identity: str, *, with_headers: bool = False, **kwargs) -> Any:
+        ratelimiter = self.ratelimiter
+        bucket = ratelimiter.get_bucket(identity, route.resource)
+
+        cache = self.response_cache if route.method == "GET" else None
+        cached = None
+        if cache is not None:
+            cached = cache.get(identity, route.url)
+            if cached is not None:
+                kwargs["headers"].update(cached.conditional_headers())
+
+        await bucket.acquire(ratelimiter.reserve)
+        try:
+            trace_ctx = {"method": route.method, "endpoint": route.endpoint}
+            async with self._concurrency_limit(identity), self.__session.request(route.method, route.url, trace_request_ctx=trace_ctx, **kwargs) as resp:
+                ratelimiter.update(identity, resp.headers, resource=route.resource)
+                if resp.status == 304 and cached is not None:
+                    cache.hits += 1
+                    if with_headers:
+                        return cached.data, cached.headers
+                    return cached.data
+
+                data = await json_or_text(resp, self.codec)
+                if resp.ok:
+                    if cache is not None:
+                        cache.misses += 1
+                        cache.store(
+                            identity,
+                            route.url,
+                            etag=resp.headers.get("ETag"),
+                            last_modified=resp.headers.get("Last-Modified"),
+                            data=data,
+                            headers=resp.headers
+                        )
+                    if with_headers:
+                        return data, resp.headers
+                    return data
+
+                raise HTTPException(data, resp)
+        finally:
+            bucket.release()
+
+    @contextlib.asynccontextmanager
+    async def _concurrency_limit(self, identity: str):
+        limits = []
+        per_identity = self.connection_options.max_concurrency_per_identity
+        if per_identity is not None:
+            try:
+                limit = self._identity_limits[identity]
+            except KeyError:
+                limit = self._identity_limits[identity] = asyncio.Semaphore(per_identity)
+            limits.append(limit)
+        if self.connection_options.max_concurrency is not None:
+            if self._global_limit is None:
+                self._global_limit = asyncio.Semaphore(self.connection_options.max_concurrency)
+            limits.append(self._global_limit)
+
+        async with contextlib.AsyncExitStack() as stack:
+            for limit in limits:
+                await stack.enter_async_context(limit)
+            yield
+
+    async def download(
+        self,
+        route: Route,
+        destination: DownloadDestination,
+        *,
+        access_token: Optional[str] = None,
+        accept: str = "application/octet-stream",
+        resume: bool = True,
+        chunk_size: int = 64 * 1024
+    ) -> int:
+        # streams a response body into `destination` without buffering or decoding it.
+        # destination may be a path, a binary file object, or an async callable taking each chunk.
+        # a path download keeps the response's validator in "<path>.resume" until it completes,
+        # and only a file with one is resumed, with If-Range so a changed object starts over.
+        if self.base_url is not None and route.url.startswith(Route.BASE):
+            route = route.with_url(self.base_url + route.url[len(Route.BASE):])
+
+        headers = {
+            "Accept": accept,
+            "User-Agent": self.user_agent
+        }
+        if access_token is not None:
+            headers["Authorization"] = "token " + access_token
+        identity = self._identity_for(headers.get("Authorization"))
+
+        is_path = isinstance(destination, (str, os.PathLike))
+        state_path = None
+        offset = 0
+        validator = None
+        if is_path:
+            state_path = os.fspath(destination) + ".resume"
+            if resume:
+                validator = self._load_resume_state(destination, state_path)
+                if validator is not None:
+                    offset = os.path.getsize(destination)
+
+        ratelimiter = self.ratelimiter
+        bucket = ratelimiter.get_bucket(identity, route.resource)
+        renew = renewed = False
+        while True:
+            if renew:
+                # outside the request, so the token fetch doesn't wait on the slots this one held.
+                headers["Authorization"] = await self._renew_token(identity, headers.get("Authorization"))
+                renew = False
+                renewed = True
+
+            request_headers = headers
+            if offset:
+                request_headers = dict(headers, Range="bytes={}-".format(offset))
+                request_headers["If-Range"] = validator
+
+            await bucket.acquire(ratelimiter.reserve)
+            try:
+                trace_ctx = {"method": route.method, "endpoint": route.endpoint}
+                async with self._concurrency_limit(identity), self.__session.request(route.method, route.url, headers=request_headers, trace_request_ctx=trace_ctx) as resp:
+                    ratelimiter.update(identity, resp.headers, resource=route.resource)
+                    if resp.status == 416 and offset:
+                        _, size = _parse_content_range(resp.headers.get("Content-Range"))
+                        if size == offset:
+                            # the range starts at the end, so the file is already complete.
+                            self._clear_resume_state(state_path)
+                            return 0
+                        offset = 0 # not the size we have, so download it again.
+                        continue
+                    if resp.status == 401 and not renewed and identity.startswith("installation:"):
+                        renew = True
+                        continue
+                    if not resp.ok:
+                        data = await json_or_text(resp, self.codec)
+                        raise HTTPException(data, resp)
+
+                    if resp.status == 206:
+                        start, _ = _parse_content_range(resp.headers.get("Content-Range"))
+                        if start != offset:
+                            offset = 0 # not the range we asked for, so download it again.
+                            continue
+                    else:
+                        offset = 0 # the server ignored the range, or the object changed.
+
+                    _log.debug("Streaming %s %s from byte %d" % (route.method, route.url, offset))
+                    if not is_path:
+                        return await self._stream_to(resp, destination, chunk_size)
+
+                    if not offset:
+                        self._save_resume_state(state_path, _resume_validator(resp.headers))
+                    mode = "ab" if offset else "wb"
+                    with open(destination, mode) as f:
+                        written = await self._stream_to(resp, f, chunk_size)
+                    self._clear_resume_state(state_path)
+                    return written
+            finally:
+                bucket.release()
+
+    @staticmethod
+    def _load_resume_state(destination: DownloadDestination, state_path: str) -> Optional[str]:
+        try:
+            with open(state_path, "r") as f:
+                validator = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if validator and os.path.exists(destination) and os.path.getsize(destination):
+            return validator
+        return None
+
+    @staticmethod
+    def _save_resume_state(state_path: str, validator: Optional[str]):
+        if validator is None:
+            # nothing to check a later resume against, so it can't be resumed.
+            HTTPClient._clear_resume_state(state_path)
+            return
+        with open(state_path, "w") as f:
+            f.write(validator)
+
+    @staticmethod
+    def _clear_resume_state(state_path: Optional[str]):
+        if state_path is None:
+            return
+        try:
+            os.remove(state_path)
+        except FileNotFoundError:
+            pass
+
+    async def _stream_to(self, resp: aiohttp.ClientResponse, destination: Any, chunk_size: int) -> int:
+        loop = asyncio.get_running_loop()
+        written = 0
+        async for chunk in resp.content.iter_chunked(chunk_size):
+            if hasattr(destination, "write"):
+                # file writes can block, so they stay off the event loop.
+                await loop.run_in_executor(None, destination.write, chunk)
+            else:
+                await destination(chunk)
+            written += len(chunk)
+        return written
+
+    @property
+    def ratelimits(self) -> List[RateLimitBucket]:
+        return self.ratelimiter.buckets
 
     def fetch_app(self):
         route = Route("GET", "/app")
         return self.request_with_jwt(route)
 
-    def fetch_installations(self):
-        route = Route("GET", "/app/installations")
-        return self.request_with_jwt(route)
-
     def fetch_repo_installation(self, owner: str, repo: str):
         route = Route(
             "GET",
@@ -183,6 +614,15 @@ class HTTPClient:
         )
         return self.request(route)
 
+    def iter_repository_contributors(self, owner: str, repo: str, *, prefetch: bool = True) -> PaginatedIterator[dict]:
+        route = Route(
+            "GET",
+            "/repos/{owner}/{repo}/contributors",
+            owner=owner, repo=repo
+        )
+        fetch = lambda r: self.request(r, with_headers=True)
+        return PaginatedIterator(fetch, route, prefetch=prefetch)
+
     def fetch_installations(self):
         route = Route(
             "GET",
@@ -190,6 +630,40 @@ class HTTPClient:
         )
         return self.request_with_jwt(route)
 
+    def iter_installations(self, *, prefetch: bool = True) -> PaginatedIterator[dict]:
+        route = Route(
+            "GET",
+            "/app/installations"
+        )
+        fetch = lambda r: self.request_with_jwt(r, with_headers=True)
+        return PaginatedIterator(fetch, route, prefetch=prefetch)
+
+    # webhook deliveries
+    def iter_hook_deliveries(self, *, prefetch: bool = False) -> PaginatedIterator[dict]:
+        # newest first, paged by cursor through the Link header.
+        route = Route(
+            "GET",
+            "/app/hook/deliveries"
+        )
+        fetch = lambda r: self.request_with_jwt(r, with_headers=True)
+        return PaginatedIterator(fetch, route, prefetch=prefetch)
+
+    def fetch_hook_delivery(self, delivery_id: int):
+        route = Route(
+            "GET",
+            "/app/hook/deliveries/{delivery_id}",
+            delivery_id=str(delivery_id)
+        )
+        return self.request_with_jwt(route)
+
+    def redeliver_hook_delivery(self, delivery_id: int):
+        route = Route(
+            "POST",
+            "/app/hook/deliveries/{delivery_id}/attempts",
+            delivery_id=str(delivery_id)
+        )
+        return self.request_with_jwt(route)
+
     # issues
     def fetch_all_issues(self):
         route = Route("GET", "/issues")
@@ -318,6 +792,28 @@ class HTTPClient:
         }
         return self.request(route, json=payload, headers=headers)
 
+    def add_issue_labels(
+        self,
+        owner: str,
+        repo: str,
+        issue_number: int,
+        access_token: str,
+        labels: List[str]
+    ):
+        route = Route(
+            "POST",
+            "/repos/{owner}/{repo}/issues/{issue_number}/labels",
+            owner=owner, repo=repo,
+            issue_number=issue_number
+        )
+        payload = {
+            "labels": labels
+        }
+        headers = {
+            "Authorization": "token " + access_token
+        }
+        return self.request(route, json=payload, headers=headers)
+
     def fetch_issue_comment(
         self,
         owner: str,
@@ -331,4 +827,89 @@ class HTTPClient:
             owner=owner, repo=repo,
             comment_id=comment_id
         )
-        return self.request(route)
\ No newline at end of file
+        return self.request(route)
+
+    # graphql
+    def graphql(
+        self,
+        query: str,
+        access_token: str,
+        *,
+        variables: Optional[Dict[str, Any]] = None
+    ):
+        route = Route("POST", "/graphql")
+        route.idempotent = not query.lstrip().startswith("mutation")
+
+        payload = {
+            "query": query,
+            "variables": variables or {}
+        }
+        headers = {
+            "Authorization": "token " + access_token
+        }
+        return self.request(route, json=payload, headers=headers)
+
+    # contents
+    def download_archive(
+        self,
+        owner: str,
+        repo: str,
+        destination: DownloadDestination,
+        access_token: Optional[str] = None,
+        *,
+        format: str = "tarball",
+        ref: Optional[str] = None,
+        resume: bool = True
+    ):
+        if format not in ("tarball", "zipball"):
+            raise ValueError("format must be either 'tarball' or 'zipball'.")
+
+        endpoint = "/repos/{owner}/{repo}/" + format
+        if ref is not None:
+            endpoint += "/{ref}"
+
+        route = Route("GET", endpoint, owner=owner, repo=repo, ref=ref)
+        return self.download(route, destination, access_token=access_token, resume=resume)
+
+    def download_repository_file(
+        self,
+        owner: str,
+        repo: str,
+        path: str,
+        destination: DownloadDestination,
+        access_token: Optional[str] = None,
+        *,
+        ref: Optional[str] = None,
+        resume: bool = True
+    ):
+        route = Route(
+            "GET",
+            "/repos/{owner}/{repo}/contents/{path}",
+            owner=owner, repo=repo, path=path.lstrip("/")
+        )
+        if ref is not None:
+            route = route.with_query(ref=ref)
+        return self.download(
+            route,
+            destination,
+            access_token=access_token,
+            accept="application/vnd.github.raw",
+            resume=resume
+        )
+
+    def download_release_asset(
+        self,
+        owner: str,
+        repo: str,
+        asset_id: int,
+        destination: DownloadDestination,
+        access_token: Optional[str] = None,
+        *,
+        resume: bool = True
+    ):
+        route = Route(
+            "GET",
+            "/repos/{owner}/{repo}/releases/assets/{asset_id}",
+            owner=owner, repo=repo, asset_id=str(asset_id)
+        )
+        return self.download(route, destination, access_token=access_token, resume=resume)
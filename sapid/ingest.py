@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional
+)
+
+from multidict import CIMultiDict
+
+from .codec import JSONCodec, get_codec
+
+
+__all__ = (
+    "Delivery",
+    "IngestQueue",
+    "RecentDeliveries",
+)
+
+_log = logging.getLogger(__name__)
+
+OVERLOAD_POLICIES = ("block", "shed", "spill")
+
+# the headers a delivery needs once it leaves the request.
+KEPT_HEADERS = (
+    "X-GitHub-Event",
+    "X-GitHub-Delivery",
+    "X-GitHub-Hook-ID",
+    "X-GitHub-Hook-Installation-Target-ID",
+    "X-GitHub-Hook-Installation-Target-Type",
+    "X-Hub-Signature-256",
+    "Content-Type",
+)
+
+_LENGTHS = struct.Struct(">II")
+_OFFSET = struct.Struct(">Q")
+
+class Delivery:
+    """A verified webhook delivery that has not been decoded yet."""
+
+    __slots__ = ("headers", "body", "received_at", "spool_id")
+
+    def __init__(self, headers: Dict[str, str], body: bytes, *, received_at: Optional[float] = None):
+        self.headers = CIMultiDict(headers)
+        self.body = body
+        self.received_at = received_at if received_at is not None else time.time()
+        self.spool_id: Optional[int] = None # set once the delivery is written to a DeliverySpool.
+
+    def __repr__(self) -> str:
+        fmt = "<Delivery event={0!r} id={1!r} size={2}>"
+        return fmt.format(self.event, self.id, len(self.body))
+
+    @classmethod
+    def from_request(cls, headers: Any, body: bytes) -> Delivery:
+        kept = {}
+        for name in KEPT_HEADERS:
+            value = headers.get(name)
+            if value is not None:
+                kept[name] = value
+        return cls(kept, body)
+
+    @property
+    def event(self) -> Optional[str]:
+        return self.headers.get("X-GitHub-Event")
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.headers.get("X-GitHub-Delivery")
+
+class RecentDeliveries:
+    """A bounded set of recently seen ``X-GitHub-Delivery`` ids.
+
+    Ids are forgotten after ``ttl`` seconds, or oldest first once there are
+    more than ``maxsize`` of them. GitHub keeps the id when it redelivers,
+    so this is enough to catch retries and manual redeliveries.
+    """
+    def __init__(self, *, maxsize: int = 10000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, delivery_id: str) -> bool:
+        expires = self._seen.get(delivery_id)
+        return expires is not None and expires > time.monotonic()
+
+    def _expire(self, now: float):
+        seen = self._seen
+        # insertion order is expiry order, so only the front needs checking.
+        while seen:
+            delivery_id, expires = next(iter(seen.items()))
+            if expires > now:
+                break
+            del seen[delivery_id]
+
+    def check(self, delivery_id: Optional[str]) -> bool:
+        """Records ``delivery_id``. Returns ``True`` if it was already seen."""
+        if delivery_id is None:
+            return False
+
+        now = time.monotonic()
+        self._expire(now)
+        if delivery_id in self._seen:
+            self.duplicates += 1
+            return True
+
+        self._seen[delivery_id] = now + self.ttl
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        return False
+
+    def forget(self, delivery_id: Optional[str]):
+        # used when a delivery wasn't processed, so its redelivery gets through.
+        if delivery_id is not None:
+            self._seen.pop(delivery_id, None)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._seen),
+            "maxsize": self.maxsize,
+            "duplicates": self.duplicates
+        }
+
+class _SpillFile:
+    # an append-only overflow file, read back from the front in arrival order.
+    # how far it has been read is kept in "<path>.offset", so a restart doesn't replay it.
+    def __init__(self, path: str, codec: JSONCodec):
+        self.path = path
+        self._codec = codec
+        self._write = open(path, "ab")
+        # unbuffered, so a read never serves bytes from before a truncate.
+        self._read = open(path, "rb", buffering=0)
+        self._offset_fd = os.open(path + ".offset", os.O_RDWR | os.O_CREAT, 0o644)
+        self.pending = self._count()
+
+    def _load_offset(self) -> int:
+        data = os.pread(self._offset_fd, _OFFSET.size, 0)
+        if len(data) < _OFFSET.size:
+            return 0
+        return _OFFSET.unpack(data)[0]
+
+    def _save_offset(self, offset: int):
+        os.pwrite(self._offset_fd, _OFFSET.pack(offset), 0)
+
+    def _count(self) -> int:
+        # picks up whatever an earlier process left unread.
+        end = os.path.getsize(self.path)
+        start = self._load_offset()
+        if start > end:
+            start = 0 # the file was replaced under us.
+
+        count = 0
+        position = good = start
+        while position + _LENGTHS.size <= end:
+            self._read.seek(position)
+            meta_size, body_size = _LENGTHS.unpack(self._read.read(_LENGTHS.size))
+            position += _LENGTHS.size + meta_size + body_size
+            if position > end:
+                break
+            good = position
+            count += 1
+
+        if good < end:
+            # a torn write at the tail. new records must not land after it.
+            _log.warning("Dropping %d bytes of a torn record at the end of %s." % (end - good, self.path))
+            self._write.truncate(good)
+        if not count:
+            self._write.truncate(0)
+            start = 0
+        self._save_offset(start)
+        self._read.seek(start)
+        return count
+
+    def append(self, delivery: Delivery):
+        headers = {str(name): value for name, value in delivery.headers.items()} # orjson refuses istr keys.
+        meta = self._codec.dumps({"headers": headers, "received_at": delivery.received_at, "spool_id": delivery.spool_id})
+        self._write.write(_LENGTHS.pack(len(meta), len(delivery.body)) + meta + delivery.body)
+        self._write.flush()
+        self.pending += 1
+
+    def pop(self) -> Delivery:
+        meta_size, body_size = _LENGTHS.unpack(self._read.read(_LENGTHS.size))
+        meta = self._codec.loads(self._read.read(meta_size))
+        body = self._read.read(body_size)
+        self.pending -= 1
+        if not self.pending:
+            # everything has been read back, so the file can start over.
+            self._write.truncate(0)
+            self._read.seek(0)
+        self._save_offset(self._read.tell())
+        delivery = Delivery(meta["headers"], body, received_at=meta["received_at"])
+        delivery.spool_id = meta.get("spool_id")
+        return delivery
+
+    def close(self):
+        self._write.close()
+        self._read.close()
+        os.close(self._offset_fd)
+
+class IngestQueue:
+    """Decouples acknowledging webhook deliveries from processing them.
+
+    Verified deliveries are queued and acknowledged right away, then decoded
+    and dispatched by ``workers`` background tasks. When all ``maxsize`` slots
+    are taken, ``overload`` decides what happens to a new delivery:
+
+    - ``"block"`` waits up to ``block_timeout`` seconds for a slot, then sheds.
+    - ``"shed"`` answers 503 straight away, so GitHub records a failed delivery
+      that can be redelivered later.
+    - ``"spill"`` appends it to the file at ``spill_path``. Spilled deliveries
+      are fed back into the queue, in order, as it drains.
+    """
+    def __init__(
+        self,
+        *,
+        workers: int = 4,
+        maxsize: int = 1000,
+        overload: str = "block",
+        block_timeout: float = 5.0,
+        spill_path: Optional[str] = None,
+        codec: Optional[JSONCodec] = None
+    ):
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError("overload must be one of {0}, not {1!r}.".format(", ".join(OVERLOAD_POLICIES), overload))
+        if overload == "spill" and spill_path is None:
+            raise ValueError("The spill overload policy needs a spill_path.")
+
+        self.workers = workers
+        self.maxsize = maxsize
+        self.overload = overload
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        self._codec = codec if codec is not None else get_codec()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handler: Optional[Callable[[Delivery], Awaitable[Any]]] = None
+        self._spill: Optional[_SpillFile] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._busy = 0
+
+        self.accepted = 0
+        self.processed = 0
+        self.failed = 0
+        self.shed = 0
+        self.spilled = 0
+        self.max_depth = 0
+        self.queue_latency = 0.0 # summed seconds between acceptance and a worker picking it up.
+
+    def __repr__(self) -> str:
+        fmt = "<IngestQueue workers={0.workers!r} depth={0.depth!r} maxsize={0.maxsize!r} overload={0.overload!r}>"
+        return fmt.format(self)
+
+    @property
+    def depth(self) -> int:
+        queue = self._queue
+        return queue.qsize() if queue is not None else 0
+
+    @property
+    def spill_depth(self) -> int:
+        return self._spill.pending if self._spill is not None else 0
+
+    @property
+    def unfinished(self) -> int:
+        # queued, spilled, or being handled by a worker right now.
+        return self.depth + self.spill_depth + self._busy
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "spill_depth": self.spill_depth,
+            "accepted": self.accepted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "shed": self.shed,
+            "spilled": self.spilled,
+            "queue_latency": self.queue_latency
+        }
+
+    def start(self, handler: Callable[[Delivery], Awaitable[Any]]):
+        if self._tasks:
+            return
+
+        self._handler = handler
+        self._queue = asyncio.Queue(self.maxsize)
+        if self.overload == "spill":
+            self._spill = _SpillFile(self.spill_path, self._codec)
+
+        self._tasks = [asyncio.ensure_future(self._worker(index)) for index in range(self.workers)]
+        if self.spill_depth:
+            _log.info("Replaying %d spilled deliveries from %s." % (self.spill_depth, self.spill_path))
+            self._refill_task = asyncio.ensure_future(self._refill())
+        _log.debug("Started %d ingest workers." % self.workers)
+
+    async def put(self, delivery: Delivery) -> bool:
+        """Queues a delivery. Returns ``False`` when it was shed."""
+        queue = self._queue
+        if queue is None:
+            raise RuntimeError("The ingest queue has not been started.")
+
+        spill = self._spill
+        # once anything has spilled, later deliveries queue behind it to keep their order.
+        if not queue.full() and (spill is None or not spill.pending):
+            self._accept(delivery)
+            return True
+
+        if self.overload == "spill":
+            spill.append(delivery)
+            self.spilled += 1
+            self.accepted += 1
+            if self._refill_task is None or self._refill_task.done():
+                self._refill_task = asyncio.ensure_future(self._refill())
+            return True
+
+        if self.overload == "block":
+            try:
+                await asyncio.wait_for(queue.put(delivery), timeout=self.block_timeout)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                self.accepted += 1
+                self._record_depth()
+                return True
+
+        self.shed += 1
+        _log.warning("Shed delivery %s, the ingest queue is full." % delivery.id)
+        return False
+
+    def _accept(self, delivery: Delivery):
+        self._queue.put_nowait(delivery)
+        self.accepted += 1
+        self._record_depth()
+
+    def _record_depth(self):
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def _refill(self):
+        spill = self._spill
+        while spill.pending:
+            delivery = spill.pop()
+            await self._queue.put(delivery)
+            self._record_depth()
+
+    async def _worker(self, index: int):
+        queue = self._queue
+        while True:
+            delivery = await queue.get()
+            self.queue_latency += max(time.time() - delivery.received_at, 0.0)
+            self._busy += 1
+            try:
+                await self._handler(delivery)
+            except Exception:
+                self.failed += 1
+                _log.exception("Ingest worker %d failed to process delivery %s." % (index, delivery.id))
+            else:
+                self.processed += 1
+            finally:
+                self._busy -= 1
+                queue.task_done()
+
+    async def join(self):
+        """Waits until every queued and spilled delivery has been processed."""
+        if self._refill_task is not None:
+            await self._refill_task
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        tasks = self._tasks
+        if self._refill_task is not None:
+            tasks = tasks + [self._refill_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._refill_task = None
+
+        if self._spill is not None:
+            if self._spill.pending:
+                _log.warning("%d spilled deliveries were left unprocessed in %s." % (self._spill.pending, self.spill_path))
+            self._spill.close()
+            self._spill = None
@@ -8,8 +8,8 @@ from typing import (
     Optional
 )
 
-from .user import BaseUser
-from .utils import Cacheable, parse_to_dt, safe_convert
+from .user import BaseUser, _user_field
+from .utils import Cacheable, lazy_field, set_payload, _dt_field
 
 if TYPE_CHECKING:
     from .state import ApplicationState
@@ -45,24 +45,21 @@ class Installation(Cacheable):
         self._update(data)
 
     def _update(self, data: InstallationPayload):
-        self.id = data["id"]
-        self.account = BaseUser(state=self._state, data=data["account"])
-        self.repository_selection = data["repository_selection"]
-        self.access_tokens_url = data["access_tokens_url"]
-        self.repositories_url = data["repositories_url"]
-        self.html_url = data["html_url"]
-        self.app_id = data["app_id"]
-        self.app_slug = data["app_slug"]
-        self.target_type = data["target_type"]
-        self.permissions = data["permissions"]
-        self.events = data["events"]
-        self.created_at = parse_to_dt(data["created_at"])
-        self.updated_at = parse_to_dt(data["updated_at"])
-        self.has_multiple_files = data.get("has_multiple_files")
-        self.suspended_by = safe_convert(
-            BaseUser,
-            data.get("suspended_by"),
-            state=self._state,
-            data=data.get("suspended_by")
-        )
-        self.suspended_at = parse_to_dt(data.get("suspended_at"))
\ No newline at end of file
+        set_payload(self, data)
+
+    id = lazy_field()
+    account = lazy_field(convert=_user_field)
+    repository_selection = lazy_field()
+    access_tokens_url = lazy_field()
+    repositories_url = lazy_field()
+    html_url = lazy_field()
+    app_id = lazy_field()
+    app_slug = lazy_field()
+    target_type = lazy_field()
+    permissions = lazy_field()
+    events = lazy_field()
+    created_at = lazy_field(convert=_dt_field)
+    updated_at = lazy_field(convert=_dt_field)
+    has_multiple_files = lazy_field(default=None)
+    suspended_by = lazy_field(convert=_user_field, default=None)
+    suspended_at = lazy_field(convert=_dt_field, default=None)
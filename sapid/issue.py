@@ -9,10 +9,10 @@ from typing import (
     Union
 )
 
-from .user import BaseUser
+from .user import BaseUser, _user_field
 from .comment import Comment
 from .enums import IssueLockReason
-from .utils import Cacheable, _parse_list_to_object
+from .utils import Cacheable, lazy_field, set_payload, _parse_list_to_object
 
 if TYPE_CHECKING:
     from .state import ApplicationState
@@ -68,7 +68,7 @@ class Issue(Cacheable):
             owner=self.repository.owner.login,
             repo=self.repository.name,
             issue_number=self.number,
-            access_token=access_token["token"],
+            access_token=access_token.token,
             reason=reason
         )
     
@@ -78,7 +78,7 @@ class Issue(Cacheable):
             owner=self.repository.owner.login,
             repo=self.repository.name,
             issue_number=self.number,
-            access_token=access_token["token"]
+            access_token=access_token.token
         )
 
     async def create_comment(self, body: str) -> Comment:
@@ -88,11 +88,23 @@ class Issue(Cacheable):
             repo=self.repository.name,
             issue_number=self.number,
             body=body,
-            access_token=access_token["token"]
+            access_token=access_token.token
         )
         comment = Comment(state=self._state, data=data, issue=self)
         return comment
 
+    async def add_labels(self, labels: List[str]) -> List[dict]:
+        access_token = await self.repository.fetch_access_token(cache=True)
+        data = await self._state._http.add_issue_labels(
+            owner=self.repository.owner.login,
+            repo=self.repository.name,
+            issue_number=self.number,
+            labels=labels,
+            access_token=access_token.token
+        )
+        self.labels = data
+        return data
+
     async def fetch_comment(self, comment_id: int, /) -> Comment:
         data = await self._state._http.fetch_issue_comment(
             owner=self.repository.owner.login,
@@ -102,37 +114,32 @@ class Issue(Cacheable):
         comment = Comment(state=self._state, data=data, issue=self)
         return comment
 
-    
     def _update(self, data: IssuePayload, repository: Repository):
-        self.url = data["url"]        
-        self.repository_url = data["repository_url"]
-        self.labels_url = data["labels_url"]
-        self.comments_url = data["comments_url"]
-        self.events_url = data["events_url"]
-        self.html_url = data["html_url"]
-        self.id = data["id"]
-        self.node_id = data["node_id"]
-        self.number = data["number"]
-        self.title = data["title"]
-        self.user = data["user"]
-        self.labels = data["labels"]
-        self.state = data["state"]
-        self.locked = data["locked"]
-        self.assignee = data["assignee"]
-        self.assignees = data["assignees"]
-        self.comments = data["comments"]
-        self.created_at = data["created_at"]
-        self.updated_at = data["updated_at"]
-        self.closed_at = data["closed_at"]
-        self.author_association = data["author_association"]
-        self.body = data["body"]
-        self.reactions = data["reactions"]
-        self.timeline_url = data["timeline_url"]
-        self.performed_via_github_app = data["performed_via_github_app"]
+        set_payload(self, data)
         self.repository = repository
 
-        if self.assignee is not None:
-            _user = BaseUser(state=self._state, data=self.assignee)
-            self.assignee = _user
-        
-        self.assignees = _parse_list_to_object(BaseUser, state=self._state, data=self.assignees)
\ No newline at end of file
+    url = lazy_field()
+    repository_url = lazy_field()
+    labels_url = lazy_field()
+    comments_url = lazy_field()
+    events_url = lazy_field()
+    html_url = lazy_field()
+    id = lazy_field()
+    node_id = lazy_field()
+    number = lazy_field()
+    title = lazy_field()
+    user = lazy_field()
+    labels = lazy_field()
+    state = lazy_field()
+    locked = lazy_field()
+    assignee = lazy_field(convert=_user_field)
+    assignees = lazy_field(convert=lambda self, data: _parse_list_to_object(BaseUser, state=self._state, data=data))
+    comments = lazy_field()
+    created_at = lazy_field()
+    updated_at = lazy_field()
+    closed_at = lazy_field()
+    author_association = lazy_field()
+    body = lazy_field()
+    reactions = lazy_field()
+    timeline_url = lazy_field()
+    performed_via_github_app = lazy_field()
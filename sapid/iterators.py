@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Generic
+)
+
+from .utils import parse_link_header
+
+if TYPE_CHECKING:
+    from multidict import CIMultiDictProxy
+    from .http import Route
+
+
+__all__ = (
+    "PaginatedIterator",
+)
+
+T = TypeVar("T")
+PageFetcher = Callable[["Route"], Awaitable[Tuple[Any, "CIMultiDictProxy[str]"]]]
+
+class PaginatedIterator(Generic[T]):
+    """Iterates over every item of a paginated endpoint by following its ``Link`` header.
+
+    Items are yielded as soon as their page arrives. With ``prefetch`` enabled,
+    the next page is requested while the caller works through the current one.
+    """
+    def __init__(
+        self,
+        fetch: PageFetcher,
+        route: Route,
+        *,
+        per_page: int = 100,
+        key: Optional[str] = None,
+        prefetch: bool = True
+    ):
+        self._fetch = fetch
+        self._base_route = route
+        self._route: Optional[Route] = route.with_query(per_page=per_page)
+        self._key = key
+        self._prefetch = prefetch
+        self._transform: Callable[[Any], Any] = lambda item: item
+
+        self._items: Deque[Any] = deque()
+        self._next_page: Optional[asyncio.Future] = None
+
+    def __aiter__(self) -> PaginatedIterator[T]:
+        return self
+
+    async def __anext__(self) -> T:
+        while not self._items:
+            if self._route is None and self._next_page is None:
+                raise StopAsyncIteration
+            await self._fill()
+
+        return self._transform(self._items.popleft())
+
+    def map(self, func: Callable[[Any], Any]) -> PaginatedIterator[Any]:
+        previous = self._transform
+        self._transform = lambda item: func(previous(item))
+        return self
+
+    async def flatten(self) -> List[T]:
+        return [item async for item in self]
+
+    async def aclose(self):
+        if self._next_page is not None:
+            self._next_page.cancel()
+            self._next_page = None
+        self._route = None
+        self._items.clear()
+
+    async def _fill(self):
+        if self._next_page is not None:
+            page = self._next_page
+            self._next_page = None
+        else:
+            page = self._fetch(self._route)
+
+        data, headers = await page
+        items = data[self._key] if self._key is not None else data
+        self._items.extend(items)
+
+        links: Dict[str, str] = parse_link_header(headers.get("Link"))
+        next_url = links.get("next")
+        if next_url is None:
+            self._route = None
+            return
+
+        route = self._base_route.with_url(next_url)
+        if self._prefetch:
+            self._next_page = asyncio.ensure_future(self._fetch(route))
+            self._route = None
+        else:
+            self._route = route
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import bisect
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Sequence,
+    Tuple
+)
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from .http import HTTPClient
+
+
+__all__ = (
+    "Histogram",
+    "HTTPMetrics",
+)
+
+DEFAULT_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """A cumulative histogram with fixed upper bounds, in the Prometheus style."""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1) # the last slot is +Inf.
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((repr(bound), total))
+        pairs.append(("+Inf", total + self.counts[-1]))
+        return pairs
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels: Any) -> str:
+    inner = ",".join('{0}="{1}"'.format(key, _escape(value)) for key, value in labels.items())
+    return "{" + inner + "}"
+
+class HTTPMetrics:
+    """Per-route instrumentation for :class:`~sapid.http.HTTPClient`.
+
+    Everything is recorded through an aiohttp :class:`~aiohttp.TraceConfig`,
+    so it only covers sessions the client creates itself.
+    """
+    def __init__(self, http: HTTPClient, *, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._http = http
+        self._buckets = buckets
+
+        # keyed by (method, endpoint).
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.statuses: Counter[Tuple[str, str, str]] = Counter()
+        self.bytes_sent: Counter[Tuple[str, str]] = Counter()
+        self.bytes_received: Counter[Tuple[str, str]] = Counter()
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(self._on_request_start)
+        config.on_request_end.append(self._on_request_end)
+        config.on_request_exception.append(self._on_request_exception)
+        config.on_request_chunk_sent.append(self._on_request_chunk_sent)
+        config.on_response_chunk_received.append(self._on_response_chunk_received)
+        config.on_connection_create_end.append(self._on_connection_create_end)
+        config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return config
+
+    @staticmethod
+    def _key(context: SimpleNamespace) -> Tuple[str, str]:
+        ctx = context.trace_request_ctx or {}
+        return ctx.get("method", "?"), ctx.get("endpoint", "unknown")
+
+    async def _on_request_start(self, session, context, params):
+        context.start = time.perf_counter()
+
+    def _observe(self, context: SimpleNamespace, status: str):
+        key = self._key(context)
+        try:
+            histogram = self.latency[key]
+        except KeyError:
+            histogram = self.latency[key] = Histogram(self._buckets)
+        histogram.observe(time.perf_counter() - context.start)
+        self.statuses[key + (status,)] += 1
+
+    async def _on_request_end(self, session, context, params):
+        self._observe(context, str(params.response.status))
+
+    async def _on_request_exception(self, session, context, params):
+        self._observe(context, "error")
+
+    async def _on_request_chunk_sent(self, session, context, params):
+        self.bytes_sent[self._key(context)] += len(params.chunk)
+
+    async def _on_response_chunk_received(self, session, context, params):
+        self.bytes_received[self._key(context)] += len(params.chunk)
+
+    async def _on_connection_create_end(self, session, context, params):
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn(self, session, context, params):
+        self.connections_reused += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        http = self._http
+        routes = {}
+        for (method, endpoint), histogram in self.latency.items():
+            routes["{0} {1}".format(method, endpoint)] = {
+                "count": histogram.count,
+                "latency_sum": histogram.sum,
+                "latency_buckets": dict(histogram.cumulative()),
+                "statuses": {
+                    status: count
+                    for (m, e, status), count in self.statuses.items()
+                    if (m, e) == (method, endpoint)
+                },
+                "bytes_sent": self.bytes_sent[(method, endpoint)],
+                "bytes_received": self.bytes_received[(method, endpoint)]
+            }
+
+        cache = http.response_cache
+        return {
+            "routes": routes,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "coalesced_requests": http.coalesced_requests,
+            "retries": http.retry_policy.stats,
+            "response_cache": cache.stats if cache is not None else None,
+            "ratelimits": {
+                "{0.identity}:{0.resource}".format(bucket): {
+                    "limit": bucket.limit,
+                    "remaining": bucket.remaining,
+                    "reset": bucket.reset
+                }
+                for bucket in http.ratelimits
+            }
+        }
+
+    def to_prometheus(self) -> str:
+        http = self._http
+        lines = []
+
+        def header(name: str, type_: str, help_: str):
+            lines.append("# HELP {0} {1}".format(name, help_))
+            lines.append("# TYPE {0} {1}".format(name, type_))
+
+        name = "sapid_http_request_duration_seconds"
+        header(name, "histogram", "Time until response headers arrived, per route.")
+        for (method, endpoint), histogram in self.latency.items():
+            for bound, count in histogram.cumulative():
+                lines.append(name + "_bucket" + _labels(method=method, endpoint=endpoint, le=bound) + " " + str(count))
+            lines.append(name + "_sum" + _labels(method=method, endpoint=endpoint) + " " + repr(histogram.sum))
+            lines.append(name + "_count" + _labels(method=method, endpoint=endpoint) + " " + str(histogram.count))
+
+        header("sapid_http_responses_total", "counter", "Responses per route and status code.")
+        for (method, endpoint, status), count in self.statuses.items():
+            lines.append("sapid_http_responses_total" + _labels(method=method, endpoint=endpoint, status=status) + " " + str(count))
+
+        header("sapid_http_request_bytes_total", "counter", "Request body bytes sent, per route.")
+        for (method, endpoint), count in self.bytes_sent.items():
+            lines.append("sapid_http_request_bytes_total" + _labels(method=method, endpoint=endpoint) + " " + str(count))
+
+        header("sapid_http_response_bytes_total", "counter", "Response body bytes received, per route.")
+        for (method, endpoint), count in self.bytes_received.items():
+            lines.append("sapid_http_response_bytes_total" + _labels(method=method, endpoint=endpoint) + " " + str(count))
+
+        header("sapid_http_connections_total", "counter", "Connections opened or reused from the pool.")
+        lines.append("sapid_http_connections_total" + _labels(kind="created") + " " + str(self.connections_created))
+        lines.append("sapid_http_connections_total" + _labels(kind="reused") + " " + str(self.connections_reused))
+
+        header("sapid_http_coalesced_requests_total", "counter", "GET requests served by an identical in-flight request.")
+        lines.append("sapid_http_coalesced_requests_total " + str(http.coalesced_requests))
+
+        header("sapid_http_retries_total", "counter", "Retried requests, per reason.")
+        for reason, count in http.retry_policy.retries.items():
+            lines.append("sapid_http_retries_total" + _labels(reason=reason) + " " + str(count))
+
+        header("sapid_http_give_ups_total", "counter", "Requests that ran out of retries, per reason.")
+        for reason, count in http.retry_policy.give_ups.items():
+            lines.append("sapid_http_give_ups_total" + _labels(reason=reason) + " " + str(count))
+
+        cache = http.response_cache
+        if cache is not None:
+            header("sapid_http_cache_requests_total", "counter", "Conditional GET cache hits and misses.")
+            lines.append("sapid_http_cache_requests_total" + _labels(result="hit") + " " + str(cache.hits))
+            lines.append("sapid_http_cache_requests_total" + _labels(result="miss") + " " + str(cache.misses))
+
+        header("sapid_ratelimit_remaining", "gauge", "Requests left in the current rate limit window.")
+        for bucket in http.ratelimits:
+            if bucket.remaining is not None:
+                lines.append("sapid_ratelimit_remaining" + _labels(identity=bucket.identity, resource=bucket.resource) + " " + str(bucket.remaining))
+
+        header("sapid_ratelimit_limit", "gauge", "Size of the rate limit window.")
+        for bucket in http.ratelimits:
+            if bucket.limit is not None:
+                lines.append("sapid_ratelimit_limit" + _labels(identity=bucket.identity, resource=bucket.resource) + " " + str(bucket.limit))
+
+        return "\n".join(lines) + "\n"
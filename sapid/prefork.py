@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import signal
+import socket
+import time
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional
+)
+
+
+__all__ = (
+    "Supervisor",
+)
+
+_log = logging.getLogger(__name__)
+
+class Supervisor:
+    """Runs ``target(index)`` in ``workers`` forked processes and keeps them alive.
+
+    A worker that exits is restarted after ``restart_delay`` seconds. If it
+    didn't stay up for ``min_uptime`` seconds the delay doubles, up to
+    ``max_restart_delay``, so a worker that crashes on start doesn't spin.
+
+    SIGTERM or SIGINT sends SIGTERM to every worker and waits up to
+    ``drain_timeout`` seconds for them to finish before killing the rest.
+    """
+    def __init__(
+        self,
+        target: Callable[[int], None],
+        *,
+        workers: int,
+        drain_timeout: float = 30.0,
+        restart_delay: float = 0.5,
+        max_restart_delay: float = 30.0,
+        min_uptime: float = 10.0,
+        poll_interval: float = 0.2
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("Running several workers needs SO_REUSEPORT, which this platform doesn't support.")
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("Running several workers needs the fork start method, which this platform doesn't support.")
+
+        self.target = target
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.min_uptime = min_uptime
+        self.poll_interval = poll_interval
+
+        self._context = multiprocessing.get_context("fork")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._started_at: List[float] = [0.0] * workers
+        self._delays: List[float] = [0.0] * workers
+        self._next_start: List[float] = [0.0] * workers
+        self._stopping = False
+
+        self.restarts: Dict[int, int] = {index: 0 for index in range(workers)}
+
+    def __repr__(self) -> str:
+        fmt = "<Supervisor workers={0.workers!r} restarts={1!r}>"
+        return fmt.format(self, sum(self.restarts.values()))
+
+    def _start(self, index: int):
+        process = self._context.Process(target=self._child, args=(index,), name="sapid-worker-{}".format(index))
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        _log.info("Started worker %d with pid %d." % (index, process.pid))
+
+    def _child(self, index: int):
+        # the supervisor's handlers came along with the fork.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # ctrl-c reaches the whole process group, but only the supervisor should act on it.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self.target(index)
+
+    def _on_signal(self, signum, frame):
+        if not self._stopping:
+            _log.info("Received signal %d, draining workers." % signum)
+        self._stopping = True
+
+    def _reap(self, index: int, process: multiprocessing.Process):
+        now = time.monotonic()
+        uptime = now - self._started_at[index]
+        _log.warning("Worker %d (pid %d) exited with code %s after %.1fs." % (index, process.pid, process.exitcode, uptime))
+
+        if uptime < self.min_uptime:
+            delay = self._delays[index] * 2 or self.restart_delay
+            self._delays[index] = min(delay, self.max_restart_delay)
+        else:
+            self._delays[index] = self.restart_delay
+
+        self._processes[index] = None
+        self._next_start[index] = now + self._delays[index]
+        self.restarts[index] += 1
+
+    def run(self):
+        previous = {
+            signum: signal.signal(signum, self._on_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            for index in range(self.workers):
+                self._start(index)
+
+            while not self._stopping:
+                now = time.monotonic()
+                for index, process in enumerate(self._processes):
+                    if process is None:
+                        if now >= self._next_start[index]:
+                            self._start(index)
+                    elif not process.is_alive():
+                        process.join()
+                        self._reap(index, process)
+                time.sleep(self.poll_interval)
+        finally:
+            self._drain()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def _drain(self):
+        processes = [process for process in self._processes if process is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.drain_timeout
+        for process in processes:
+            process.join(max(deadline - time.monotonic(), 0))
+
+        for process in processes:
+            if process.is_alive():
+                _log.warning("Worker pid %d did not drain within %.1fs, killing it." % (process.pid, self.drain_timeout))
+                process.kill()
+                process.join()
+
+        self._processes = [None] * self.workers
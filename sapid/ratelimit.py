@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+if TYPE_CHECKING:
+    from multidict import CIMultiDictProxy
+
+
+__all__ = (
+    "RateLimitBucket",
+    "RateLimiter",
+)
+
+_log = logging.getLogger(__name__)
+
+class RateLimitBucket:
+    """Tracks the quota GitHub reports for one auth identity and resource.
+
+    Requests are admitted one at a time through :meth:`acquire`. Once the
+    bucket is about to drain, the next request holds the bucket lock and
+    waits until the reset time, so everything queued behind it wakes up
+    in order as soon as the window rolls over. It also wakes up early
+    whenever a pending request is released or a response updates the
+    quota, in case that freed some up.
+    """
+
+    if TYPE_CHECKING:
+        identity: str
+        resource: str
+        limit: Optional[int]
+        remaining: Optional[int]
+        used: Optional[int]
+        reset: Optional[float]
+        retry_until: Optional[float]
+
+    def __init__(self, identity: str, resource: str):
+        self.identity = identity
+        self.resource = resource
+        self.limit = None
+        self.remaining = None
+        self.used = None
+        self.reset = None
+        self.retry_until = None # set by a secondary limit's Retry-After, apart from the primary window.
+
+        self._pending = 0 # admitted requests that have not been answered yet.
+        self._lock = asyncio.Lock()
+        self._changed: Optional[asyncio.Event] = None # made by the first request that has to wait.
+
+    def __repr__(self) -> str:
+        fmt = "<RateLimitBucket identity={0.identity!r} resource={0.resource!r} remaining={0.remaining!r} limit={0.limit!r} reset_after={0.reset_after!r}>"
+        return fmt.format(self)
+
+    @property
+    def reset_after(self) -> Optional[float]:
+        if self.reset is None:
+            return None
+        return max(self.reset - time.time(), 0.0)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def is_exhausted(self) -> bool:
+        return self._wait_until(0) is not None
+
+    def _drained(self, reserve: int) -> bool:
+        if self.remaining is None or self.reset is None:
+            return False # we know nothing about this bucket yet.
+        if self.reset <= time.time():
+            return False
+        return (self.remaining - self._pending) <= reserve
+
+    def _wait_until(self, reserve: int) -> Optional[float]:
+        # when the next request may go out, or None if it may go now.
+        until = None
+        if self.retry_until is not None and self.retry_until > time.time():
+            until = self.retry_until
+        if self._drained(reserve):
+            until = max(until or 0.0, self.reset)
+        return until
+
+    def _refill(self):
+        # the window has rolled over. Assume a full quota until GitHub tells us otherwise.
+        self.remaining = self.limit
+        self.used = 0
+
+    async def acquire(self, reserve: int = 0):
+        async with self._lock:
+            until = self._wait_until(reserve)
+            if until is not None:
+                _log.warning(
+                    "Rate limit bucket %s:%s is drained. Waiting up to %.2f seconds for it to reset." % (self.identity, self.resource, until - time.time())
+                )
+
+            while until is not None:
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=until - time.time())
+                except asyncio.TimeoutError:
+                    if self.reset is not None and self.reset <= time.time():
+                        self._refill()
+                until = self._wait_until(reserve)
+
+            self._pending += 1
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def release(self):
+        self._pending = max(self._pending - 1, 0)
+        self._notify()
+
+    def update(self, headers: CIMultiDictProxy[str]):
+        limit = headers.get("X-RateLimit-Limit")
+        remaining = headers.get("X-RateLimit-Remaining")
+        used = headers.get("X-RateLimit-Used")
+        reset = headers.get("X-RateLimit-Reset")
+        retry_after = headers.get("Retry-After")
+
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if used is not None:
+            self.used = int(used)
+        if reset is not None:
+            self.reset = float(reset)
+
+        if retry_after is not None:
+            # secondary rate limits hand us a Retry-After. Hold requests until then, so
+            # queued ones don't make things worse, but leave the primary window alone:
+            # its reset can be up to an hour away.
+            until = time.time() + float(retry_after)
+            self.retry_until = max(self.retry_until or 0.0, until)
+
+        self._notify()
+
+class RateLimiter:
+    """Holds every :class:`RateLimitBucket` the HTTP client has seen.
+
+    Buckets are keyed by ``(identity, resource)``, where the identity is
+    ``"app"`` for JWT requests, ``"installation:<id>"`` for installation
+    tokens, and ``"client"`` / ``"anonymous"`` for everything else.
+    """
+    def __init__(self, *, reserve: int = 0):
+        self.reserve = reserve
+        self._buckets: Dict[Tuple[str, str], RateLimitBucket] = {}
+
+    @staticmethod
+    def resource_for(endpoint: str) -> str:
+        if endpoint == "/graphql":
+            return "graphql"
+        if endpoint.startswith("/search"):
+            return "search"
+        return "core"
+
+    def get_bucket(self, identity: str, resource: str = "core") -> RateLimitBucket:
+        key = (identity, resource)
+        try:
+            return self._buckets[key]
+        except KeyError:
+            bucket = RateLimitBucket(identity, resource)
+            self._buckets[key] = bucket
+            return bucket
+
+    def update(self, identity: str, headers: CIMultiDictProxy[str], *, resource: str = "core") -> RateLimitBucket:
+        resource = headers.get("X-RateLimit-Resource", resource)
+        bucket = self.get_bucket(identity, resource)
+        bucket.update(headers)
+        return bucket
+
+    @property
+    def buckets(self) -> List[RateLimitBucket]:
+        return list(self._buckets.values())
@@ -8,14 +8,17 @@ from typing import (
     Any
 )
 
-from .user import BaseUser
+from .user import BaseUser, _user_field
 from .issue import Issue
 from .enums import IssueLockReason
 from .installation import Installation
-from .utils import parse_to_dt, Cacheable, NUMSTR
+from .utils import Cacheable, NUMSTR, lazy_field, set_payload, _dt_field
 
 if TYPE_CHECKING:
     from .state import ApplicationState
+    from .tokens import AccessToken
+    from .iterators import PaginatedIterator
+    from .http import DownloadDestination
     from .types.repository import Respository as RepositoryPayload
 
 
@@ -68,27 +71,33 @@ class Repository(Cacheable):
         watchers: int
         default_branch: str
 
-    def __init__(self, *, state: ApplicationState, data: RepositoryPayload):
+    def __init__(
+        self,
+        *,
+        state: ApplicationState,
+        data: RepositoryPayload,
+        installation_id: Optional[int] = None
+    ):
         self._state = state
+        self._installation_id = installation_id
         self._update(data)
 
     def __repr__(self) -> str:
         fmt = "<Repository id={0.id!r} name={0.name!r} owner={0.owner.login!r}>"
         return fmt.format(self)
 
-    async def fetch_contributors(self) -> List[BaseUser]:
-        _cs = []
-        contributors_raw = await self._state._http.fetch_repository_contributors(self.owner.login, self.name)
-        for payload in contributors_raw:
-            _user = BaseUser(state=self._state, data=payload)
-            _cs.append(_user)
+    def contributors(self, *, prefetch: bool = True) -> PaginatedIterator[BaseUser]:
+        iterator = self._state._http.iter_repository_contributors(self.owner.login, self.name, prefetch=prefetch)
+        return iterator.map(lambda payload: BaseUser(state=self._state, data=payload))
 
-        return _cs
+    async def fetch_contributors(self) -> List[BaseUser]:
+        return await self.contributors().flatten()
 
     async def fetch_installation(self, *, cache: bool = False) -> Installation:
         if cache:
-            opt_installation = self.get_cache("__installation__")
+            opt_installation = self.get_cache(("__installation__", self.id))
             if opt_installation:
+                self._installation_id = opt_installation.id
                 return opt_installation
         
         data = await self._state._http.fetch_repo_installation(
@@ -96,21 +105,24 @@ class Repository(Cacheable):
             repo=self.name
         )
         installation = Installation(state=self._state, data=data)
-        self.set_cache("__installation__", installation) # this does not depend on the cache kwarg. We cache it regardless.
+        self._installation_id = installation.id
+        self.set_cache(("__installation__", self.id), installation) # this does not depend on the cache kwarg. We cache it regardless.
         return installation
 
-    async def fetch_access_token(self, *, cache: bool = False) -> dict:
-        if cache:
-            opt_ac = self.get_cache("__access_token__")
-            if opt_ac:
-                return opt_ac
-        
-        installation = await self.fetch_installation(cache=True)
-        data = await self._state._http.fetch_access_token(installation.id)
-        self.set_cache("__access_token__", data)
-        return data
+    async def _fetch_installation_id(self) -> int:
+        if self._installation_id is None:
+            await self.fetch_installation(cache=True)
+        return self._installation_id
+
+    async def fetch_access_token(self, *, cache: bool = False) -> AccessToken:
+        installation_id = await self._fetch_installation_id()
+        return await self._state._http.tokens.get(installation_id, force=not cache)
 
     async def fetch_issue(self, issue_number: NUMSTR) -> Issue:
+        loader = self._state._loader
+        if loader is not None:
+            return await loader.load_issue(self, int(issue_number))
+
         payload = await self._state._http.fetch_issue(
             owner=self.owner.login,
             repo=self.name,
@@ -133,7 +145,7 @@ class Repository(Cacheable):
         data = await self._state._http.create_issue(
             owner=self.owner.login,
             repo=self.name,
-            access_token=access_token["token"],
+            access_token=access_token.token,
             title=title,
             body=body,
             assignee=assignee,
@@ -144,50 +156,107 @@ class Repository(Cacheable):
         issue = Issue(state=self._state, data=data, repository=self)
         return issue
 
+    async def download_archive(
+        self,
+        destination: DownloadDestination,
+        *,
+        format: str = "tarball",
+        ref: Optional[str] = None,
+        resume: bool = True
+    ) -> int:
+        access_token = await self.fetch_access_token(cache=True)
+        return await self._state._http.download_archive(
+            owner=self.owner.login,
+            repo=self.name,
+            destination=destination,
+            access_token=access_token.token,
+            format=format,
+            ref=ref,
+            resume=resume
+        )
+
+    async def download_file(
+        self,
+        path: str,
+        destination: DownloadDestination,
+        *,
+        ref: Optional[str] = None,
+        resume: bool = True
+    ) -> int:
+        access_token = await self.fetch_access_token(cache=True)
+        return await self._state._http.download_repository_file(
+            owner=self.owner.login,
+            repo=self.name,
+            path=path,
+            destination=destination,
+            access_token=access_token.token,
+            ref=ref,
+            resume=resume
+        )
+
+    async def download_release_asset(
+        self,
+        asset_id: int,
+        destination: DownloadDestination,
+        *,
+        resume: bool = True
+    ) -> int:
+        access_token = await self.fetch_access_token(cache=True)
+        return await self._state._http.download_release_asset(
+            owner=self.owner.login,
+            repo=self.name,
+            asset_id=asset_id,
+            destination=destination,
+            access_token=access_token.token,
+            resume=resume
+        )
+
     @property
     def installation(self) -> Optional[Installation]:
-        return self.get_cache("__installation__")
+        return self.get_cache(("__installation__", self.id))
     
 
     def _update(self, data: RepositoryPayload):
-        self.id = data["id"]
-        self.node_id = data["node_id"]
-        self.name = data["name"]
-        self.full_name = data["full_name"]
-        self.private = data["private"]
-        self.owner = BaseUser(state=self._state, data=data["owner"])
-        self.html_url = data["html_url"]
-        self.description = data["description"]
-        self.fork = data["fork"]
-        self.url = data["url"]
-        self.created_at = parse_to_dt(data["created_at"])
-        self.updated_at = parse_to_dt(data["updated_at"])
-        self.pushed_at = data["pushed_at"]
-        self.git_url = data["git_url"]
-        self.ssh_url = data["ssh_url"]
-        self.clone_url = data["clone_url"]
-        self.svn_url = data["svn_url"]
-        self.homepage = data["homepage"]
-        self.size = data["size"]
-        self.stargazers_count = data["stargazers_count"]
-        self.watchers_count = data["watchers_count"]
-        self.language = data["language"]
-        self.has_issues = data["has_issues"]
-        self.has_projects = data["has_projects"]
-        self.has_downloads = data["has_downloads"]
-        self.has_wiki = data["has_wiki"]
-        self.has_pages = data["has_pages"]
-        self.forks_count = data["forks_count"]
-        self.mirror_url = data["mirror_url"]
-        self.archived = data["archived"]
-        self.disabled = data["disabled"]
-        self.open_issues_count = data["open_issues_count"]
-        self.license = data["license"]
-        self.allow_forking = data["allow_forking"]
-        self.is_template = data["is_template"]
-        self.topics = data["topics"]
-        self.visibility = data["visibility"]
-        self.forks = data["forks"]
-        self.open_issues = data["open_issues"]
-        self.watchers = data["watchers"]
-        self.default_branch = data["default_branch"]
+        set_payload(self, data)
+
+    id = lazy_field()
+    node_id = lazy_field()
+    name = lazy_field()
+    full_name = lazy_field()
+    private = lazy_field()
+    owner = lazy_field(convert=_user_field)
+    html_url = lazy_field()
+    description = lazy_field()
+    fork = lazy_field()
+    url = lazy_field()
+    created_at = lazy_field(convert=_dt_field)
+    updated_at = lazy_field(convert=_dt_field)
+    pushed_at = lazy_field()
+    git_url = lazy_field()
+    ssh_url = lazy_field()
+    clone_url = lazy_field()
+    svn_url = lazy_field()
+    homepage = lazy_field()
+    size = lazy_field()
+    stargazers_count = lazy_field()
+    watchers_count = lazy_field()
+    language = lazy_field()
+    has_issues = lazy_field()
+    has_projects = lazy_field()
+    has_downloads = lazy_field()
+    has_wiki = lazy_field()
+    has_pages = lazy_field()
+    forks_count = lazy_field()
+    mirror_url = lazy_field()
+    archived = lazy_field()
+    disabled = lazy_field()
+    open_issues_count = lazy_field()
+    license = lazy_field()
+    allow_forking = lazy_field()
+    is_template = lazy_field()
+    topics = lazy_field()
+    visibility = lazy_field()
+    forks = lazy_field()
+    open_issues = lazy_field()
+    watchers = lazy_field()
+    default_branch = lazy_field()
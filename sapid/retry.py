@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import Counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Mapping,
+    Optional
+)
+
+import aiohttp
+
+
+__all__ = (
+    "RetryPolicy",
+)
+
+class RetryPolicy:
+    """Decides which failed requests are retried, and how long to wait in between.
+
+    Idempotent methods are retried on 5xx responses, dropped connections and
+    timeouts. Writes are only retried when GitHub can't have acted on them:
+    the connection was never established, or the request was rejected by a
+    secondary rate limit. Pass ``retry_writes=True`` to retry writes on 5xx too.
+
+    Delays use full jitter exponential backoff and always honour ``Retry-After``.
+    No request is retried once ``deadline`` seconds have passed since its first attempt.
+    """
+
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+    if TYPE_CHECKING:
+        max_attempts: int
+        base_delay: float
+        max_delay: float
+        deadline: float
+        retry_writes: bool
+        retries: Counter[str]
+        give_ups: Counter[str]
+
+    def __init__(
+        self,
+        *,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        deadline: float = 60.0,
+        retry_writes: bool = False
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retry_writes = retry_writes
+
+        # keyed by the reason the request failed.
+        self.retries = Counter()
+        self.give_ups = Counter()
+
+    @staticmethod
+    def is_secondary_ratelimit(status: int, data: Any, headers: Mapping[str, str]) -> bool:
+        if status == 429:
+            return True
+        if status != 403:
+            return False
+        if "Retry-After" in headers:
+            return True
+
+        message = data.get("message", "") if isinstance(data, dict) else str(data)
+        return "secondary rate limit" in message.lower()
+
+    def retry_reason(
+        self,
+        method: str,
+        *,
+        status: Optional[int] = None,
+        data: Any = None,
+        headers: Optional[Mapping[str, str]] = None,
+        exception: Optional[BaseException] = None,
+        idempotent: Optional[bool] = None
+    ) -> Optional[str]:
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        safe = idempotent or self.retry_writes
+
+        if exception is not None:
+            if isinstance(exception, aiohttp.ClientConnectorError):
+                return "connect" # nothing reached GitHub, so this is safe for any method.
+            if isinstance(exception, asyncio.TimeoutError):
+                return "timeout" if safe else None
+            if isinstance(exception, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError)):
+                return "connection_reset" if safe else None
+            return None
+
+        if status is None:
+            return None
+        if self.is_secondary_ratelimit(status, data, headers or {}):
+            return "secondary_ratelimit"
+        if status in self.RETRY_STATUSES and safe:
+            return "server_error"
+        return None
+
+    def compute_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass # an HTTP date. GitHub only sends seconds, so this isn't worth parsing.
+        return delay
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "retries": dict(self.retries),
+            "give_ups": dict(self.give_ups)
+        }
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Optional,
+    Tuple
+)
+
+if TYPE_CHECKING:
+    from .bot import GitBot
+
+
+__all__ = (
+    "Router",
+)
+
+# dispatched for every delivery, with the raw payload.
+RAW_EVENTS = ("raw_interaction_receive", "event_receive")
+
+class Router:
+    """Decides what each ``(event, action)`` pair of a delivery would reach.
+
+    Besides the parsed events, listeners can subscribe to raw payloads with
+    ``"on_<event>.<action>"`` or ``"on_<event>.*"``, e.g. ``on_issues.opened``.
+    Decisions are compiled once per pair and thrown away whenever a listener is
+    added, so a delivery nobody listens to never reaches its parser.
+    """
+    def __init__(self, bot: GitBot):
+        self._bot = bot
+        self._routes: Dict[Tuple[str, Optional[str]], Tuple[Tuple[str, ...], bool]] = {}
+        self._events: Dict[str, bool] = {}
+
+        self.skipped = 0 # deliveries whose parser never ran.
+        self.undecoded = 0 # of those, deliveries whose body was never decoded.
+
+    def invalidate(self):
+        self._routes.clear()
+        self._events.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "routes": len(self._routes),
+            "skipped": self.skipped,
+            "undecoded": self.undecoded
+        }
+
+    def _parser_events(self, event: str, action: Optional[str]) -> Optional[Tuple[str, ...]]:
+        # None when the parser doesn't declare what it dispatches, so it always runs.
+        actions = self._bot._state.parser_events.get(event)
+        if actions is None:
+            return None
+        if action in actions:
+            return actions[action]
+        return actions.get(None, ())
+
+    def _wants_parse(self, event: str, action: Optional[str]) -> bool:
+        if "parse_" + event not in self._bot._state.parsers:
+            return False
+
+        names = self._parser_events(event, action)
+        if names is None:
+            return True
+        return any(self._bot._has_listener(name) for name in names)
+
+    def route(self, event: str, action: Optional[str]) -> Tuple[Tuple[str, ...], bool]:
+        """Returns the raw ``event.action`` names with listeners, and whether to run the parser."""
+        key = (event, action)
+        try:
+            return self._routes[key]
+        except KeyError:
+            pass
+
+        has_listener = self._bot._has_listener
+        raw = tuple(
+            name
+            for name in ("{0}.{1}".format(event, action), event + ".*")
+            if has_listener(name)
+        )
+        route = self._routes[key] = (raw, self._wants_parse(event, action))
+        return route
+
+    def wants_event(self, event: str) -> bool:
+        """Whether any action of ``event`` could reach a listener, before the body is decoded."""
+        try:
+            return self._events[event]
+        except KeyError:
+            pass
+
+        bot = self._bot
+        wanted = (
+            any(bot._has_listener(name) for name in RAW_EVENTS)
+            or any(name.startswith("on_" + event + ".") for name in bot._listener_names())
+        )
+        if not wanted and "parse_" + event in bot._state.parsers:
+            actions = bot._state.parser_events.get(event)
+            if actions is None:
+                wanted = True
+            else:
+                wanted = any(bot._has_listener(name) for names in actions.values() for name in names)
+
+        self._events[event] = wanted
+        return wanted
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import hashlib
 import hmac
 import logging
+import os
 from typing import (
     Optional,
     Callable,
@@ -15,6 +16,12 @@ from typing import (
 
 from aiohttp import web
 
+from .codec import JSONCodec, get_codec
+from .errors import DeliveryShed
+from .ingest import Delivery, IngestQueue, RecentDeliveries
+from .spool import DeliverySpool
+from .routing import Router
+
 if TYPE_CHECKING:
     from aiohttp.web import Request
     from .state import ApplicationState
@@ -32,21 +39,17 @@ __all__ = (
 
 _log = logging.getLogger(__name__)
 
-async def json_or_text(request: Request) -> Union[Dict[str, Any], str]:
-    text = await request.text()
-    try:
-        if request.headers['Content-Type'].startswith('application/json'):
-            try:
-                data = json.loads(text)
-            except json.decoder.JSONDecodeError:
-                data = json.loads("{}")
-            finally:
-                return data
-    except KeyError:
-        # Thanks Cloudflare. Thanks discord.py :(
-        pass
+MAX_BODY_SIZE = 25 * 1024 * 1024 # GitHub caps webhook payloads at 25 MB.
+
+def json_or_text(body: bytes, content_type: Optional[str], codec: JSONCodec) -> Union[Dict[str, Any], str]:
+    if content_type is not None and content_type.startswith('application/json'):
+        try:
+            return codec.loads(body)
+        except ValueError:
+            return {}
+    # Thanks Cloudflare. Thanks discord.py :(
 
-    return text
+    return body.decode('utf-8')
 
 class WebhookServer:
     def __init__(
@@ -54,55 +57,220 @@ class WebhookServer:
         webhook_secret: str,
         state: ApplicationState,
         behind_proxy: bool,
-        endpoint: str = "/gitbot-interaction-receive"
+        endpoint: str = "/gitbot-interaction-receive",
+        codec: Optional[JSONCodec] = None,
+        max_body_size: int = MAX_BODY_SIZE,
+        ingest: Optional[IngestQueue] = None,
+        recent_deliveries: Optional[RecentDeliveries] = None,
+        spool: Optional[DeliverySpool] = None,
+        router: Optional[Router] = None
     ):
-        self._app = web.Application()
+        # aiohttp refuses to buffer past client_max_size, even without a Content-Length.
+        self._app = web.Application(client_max_size=max_body_size)
         self._state = state
         self._tcp: Optional[web.TCPSite] = None
         self._runner: Optional[web.AppRunner] = None
 
         self.wh_secret = webhook_secret
         self.wh_endpoint = endpoint
+        self.max_body_size = max_body_size
+        self.ingest = ingest
+        self.recent_deliveries = recent_deliveries
+        self.spool = spool
+        self.router = router
+        self.reuse_port = False # set for prefork workers sharing one port.
+
+        # requests being handled right now, so a drain can wait for them.
+        self._inflight = 0
+        self._idle: Optional[asyncio.Event] = None # made by the first request, in the serving loop.
         self._behind_proxy = behind_proxy
+        self._codec = codec if codec is not None else get_codec()
 
         self._dispatch: Optional[Callable] = None
 
+        # keyed once, then copied per delivery, so the secret isn't re-hashed every time.
+        self._hmac = hmac.new(webhook_secret.encode("utf-8"), digestmod=hashlib.sha256)
 
-    def _generate_hash(self, secret: str, payload: bytes) -> str:
-        secret = secret.encode("utf-8")
-        # payload = json.dumps(payload)
-        # payload = payload.encode("utf-8")
-        h = hmac.new(secret, payload, hashlib.sha256)
+    def _generate_hash(self, payload: bytes) -> str:
+        h = self._hmac.copy()
+        h.update(payload)
         digest = h.hexdigest()
-        return "sha256=" + digest 
-      
+        return "sha256=" + digest
+
     async def receive_interaction(self, request: web.Request) -> web.Response:
+        self._inflight += 1
+        if self._idle is None:
+            self._idle = asyncio.Event()
+        self._idle.clear()
+        try:
+            return await self._receive_interaction(request)
+        finally:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.set()
+
+    async def _receive_interaction(self, request: web.Request) -> web.Response:
         _log.info("Interaction received.")
 
         headers = request.headers
         host = request.host
-        data = await json_or_text(request)
-        request_content = await request.read() # if the json parse succeeds, this is also likely to succeed.
 
-        # verify headers
-        _hash = self._generate_hash(self.wh_secret, request_content)
         signature = headers.get("x-hub-signature-256")
-        if signature is None or not hmac.compare_digest(signature, _hash):
+        if signature is None:
+            _log.critical("Received request without a signature from %s. We have returned a 401 response." % host)
+            return web.Response(status=401)
+
+        content_length = request.content_length
+        if content_length is not None and content_length > self.max_body_size:
+            _log.warning("Rejected a %d byte request from %s before reading it." % (content_length, host))
+            return web.Response(status=413)
+
+        try:
+            request_content = await request.read()
+        except web.HTTPRequestEntityTooLarge:
+            _log.warning("Rejected a request from %s that exceeded %d bytes." % (host, self.max_body_size))
+            return web.Response(status=413)
+
+        # verify the signature before spending any time on the body.
+        _hash = self._generate_hash(request_content)
+        if not hmac.compare_digest(signature, _hash):
             # the signatures did not match.
             _log.critical("Received request with an invalid hash from %s. We have returned a 401 response." % host) # possible security risk.
             return web.Response(status=401)
-            
-        await self.handle_interaction(headers, data)
 
+        delivery_id = headers.get("X-GitHub-Delivery")
+        recent = self.recent_deliveries
+        if recent is not None and recent.check(delivery_id):
+            # a redelivery of something we already have. acknowledge it so GitHub stops retrying.
+            _log.info("Dropped duplicate delivery %s." % delivery_id)
+            return web.Response(status=200)
+
+        delivery = Delivery.from_request(headers, request_content)
+        spool = self.spool
+        if spool is not None:
+            # on disk before GitHub hears back, so a crash after this point is replayed.
+            await spool.append(delivery)
+
+        if self.ingest is not None:
+            # acknowledge now, decode and dispatch on a worker.
+            if not await self.ingest.put(delivery):
+                # GitHub will redeliver it, so it must not be replayed as well.
+                if spool is not None:
+                    spool.mark_done(delivery.spool_id)
+                if recent is not None:
+                    recent.forget(delivery_id)
+                return web.Response(status=503)
+            return web.Response(status=200)
+
+        await self.process_delivery(delivery)
         return web.Response(status=200)
 
+    async def process_delivery(self, delivery: Delivery):
+        try:
+            await self._process_delivery(delivery)
+        except asyncio.CancelledError:
+            # cut off by shutdown, so it stays in the spool and is replayed on the next start.
+            raise
+        except Exception:
+            # whether it came over HTTP, from a worker or from catch-up, let a redelivery through.
+            if self.recent_deliveries is not None:
+                self.recent_deliveries.forget(delivery.id)
+            # a delivery that fails once would fail on replay too.
+            if self.spool is not None:
+                self.spool.mark_done(delivery.spool_id)
+            raise
+
+        if self.spool is not None:
+            self.spool.mark_done(delivery.spool_id)
+
+    async def _process_delivery(self, delivery: Delivery):
+        router = self.router
+        if router is not None and not router.wants_event(delivery.event):
+            router.skipped += 1
+            router.undecoded += 1
+            return
+
+        data = json_or_text(delivery.body, delivery.headers.get("Content-Type"), self._codec)
+        await self.handle_interaction(delivery.headers, data)
+
+    def _use_worker(self, index: int):
+        # prefork workers share the port, but each needs its own files.
+        self.reuse_port = True
+        if self.spool is not None:
+            self.spool.directory = os.path.join(self.spool.directory, "worker-{}".format(index))
+        ingest = self.ingest
+        if ingest is not None and ingest.spill_path is not None:
+            ingest.spill_path = "{0}.worker-{1}".format(ingest.spill_path, index)
+
+    async def replay_spool(self):
+        spool = self.spool
+        if spool is None:
+            return
+
+        pending = spool.open()
+        recent = self.recent_deliveries
+        for delivery in pending:
+            if recent is not None:
+                recent.check(delivery.id) # so GitHub's own redelivery of it is dropped.
+
+            if self.ingest is not None:
+                if not await self.ingest.put(delivery):
+                    _log.warning("Delivery %s was shed during replay, it stays in the spool." % delivery.id)
+                    continue
+            else:
+                try:
+                    await self.process_delivery(delivery)
+                except Exception:
+                    _log.exception("Failed to replay delivery %s." % delivery.id)
+            spool.replayed += 1
+
+        if pending:
+            _log.info("Replayed %d deliveries from the spool." % spool.replayed)
+
+    async def feed(self, delivery: Delivery) -> bool:
+        """Processes a delivery that didn't arrive over HTTP, like one recovered by catch-up.
+
+        It goes through de-duplication, the spool and the ingest queue the same
+        way a received one would. Returns ``False`` if it was a duplicate, and
+        raises :class:`DeliveryShed` if the ingest queue turned it away.
+        """
+        recent = self.recent_deliveries
+        if recent is not None and recent.check(delivery.id):
+            return False
+
+        if self.spool is not None:
+            await self.spool.append(delivery)
+
+        if self.ingest is not None:
+            if not await self.ingest.put(delivery):
+                if self.spool is not None:
+                    self.spool.mark_done(delivery.spool_id)
+                if recent is not None:
+                    recent.forget(delivery.id)
+                raise DeliveryShed(delivery.id)
+            return True
+
+        await self.process_delivery(delivery)
+        return True
+
     async def handle_interaction(self, headers: dict, data: dict):
         # TODO: Actually handle interactions.
 
         self._dispatch("raw_interaction_receive", data)
         event = headers["x-github-event"]
         self._dispatch("event_receive", event, data)
-        
+
+        router = self.router
+        if router is not None:
+            action = data.get("action") if isinstance(data, dict) else None
+            raw, parse = router.route(event, action)
+            for name in raw:
+                self._dispatch(name, data)
+            if not parse:
+                # nobody listens to what the parser would dispatch, so skip building the models.
+                router.skipped += 1
+                return
+
         parser_name = "parse_" + event
         try:
             parser = self._state.parsers[parser_name]
@@ -133,13 +301,51 @@ class WebhookServer:
         self._runner = web.AppRunner(self._app)
         await self._runner.setup()
 
-        self._tcp = web.TCPSite(self._runner, host=host, port=str(port))
-        await self._tcp.start()
         self._dispatch = dispatch
+        if self.ingest is not None:
+            self.ingest.start(self.process_delivery)
+        # replayed before listening, so they run ahead of anything new.
+        await self.replay_spool()
+
+        self._tcp = web.TCPSite(self._runner, host=host, port=str(port), reuse_port=self.reuse_port or None)
+        await self._tcp.start()
         self._dispatch("sapid_tcp_ready", host, port)
 
+    async def drain(self, timeout: float) -> Dict[str, Any]:
+        """Stops accepting deliveries, then waits up to ``timeout`` seconds for accepted ones to finish.
+
+        Returns how much work was still unfinished when the time ran out.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        if self._tcp is not None:
+            await self._tcp.stop() # closes the listening socket. open requests carry on.
+            self._tcp = None
+
+        async def wait(aw) -> bool:
+            try:
+                await asyncio.wait_for(aw, timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return False
+            return True
+
+        if self._idle is not None:
+            await wait(self._idle.wait())
+        if self.ingest is not None and self.ingest.running:
+            await wait(self.ingest.join())
+
+        return {
+            "inflight_requests": self._inflight,
+            "unfinished_deliveries": self.ingest.unfinished if self.ingest is not None else 0
+        }
+
     async def cleanup(self):
         if self._tcp:
             await self._tcp.stop()
+        if self.ingest is not None:
+            await self.ingest.close()
+        if self.spool is not None:
+            await self.spool.close()
         if self._runner:
             await self._runner.cleanup()
\ No newline at end of file
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import struct
+import zlib
+from typing import (
+    BinaryIO,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+from .codec import JSONCodec, get_codec
+from .ingest import Delivery
+
+
+__all__ = (
+    "DeliverySpool",
+)
+
+_log = logging.getLogger(__name__)
+
+# kind, sequence number, meta length, body length, crc32 of meta + body.
+_HEADER = struct.Struct(">BQIII")
+_DELIVERY = 1
+_DONE = 2
+
+SEGMENT_PREFIX = "spool-"
+SEGMENT_SUFFIX = ".log"
+_SEGMENT_PATTERN = re.compile(r"^" + re.escape(SEGMENT_PREFIX) + r"(\d+)" + re.escape(SEGMENT_SUFFIX) + r"$")
+
+def _segment_name(number: int) -> str:
+    return "{0}{1:08d}{2}".format(SEGMENT_PREFIX, number, SEGMENT_SUFFIX)
+
+def _read_records(path: str) -> List[Tuple[int, int, bytes, bytes]]:
+    records = []
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            kind, seq, meta_size, body_size, crc = _HEADER.unpack(header)
+            meta = f.read(meta_size)
+            body = f.read(body_size)
+            if len(meta) < meta_size or len(body) < body_size or zlib.crc32(meta + body) != crc:
+                # a torn write from a crash. nothing after it was acknowledged.
+                _log.warning("Ignoring a torn record at the end of %s." % path)
+                break
+            records.append((kind, seq, meta, body))
+    return records
+
+def _fsync_and_close(fd: int):
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class DeliverySpool:
+    """An append-only, segment rotated log of verified webhook deliveries.
+
+    Deliveries are appended before they are acknowledged, and a done mark is
+    appended once they have been dispatched. Anything without a done mark
+    when the bot starts is replayed. Appends wait for an ``fsync``, but every
+    append made within ``fsync_interval`` seconds shares the same one.
+
+    Segments are rotated past ``segment_size`` bytes and deleted, oldest
+    first, once every delivery in them is done.
+    """
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_size: int = 64 * 1024 * 1024,
+        fsync_interval: float = 0.005,
+        codec: Optional[JSONCodec] = None
+    ):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self._codec = codec if codec is not None else get_codec()
+
+        self._file: Optional[BinaryIO] = None
+        self._segment = 0
+        self._seq = 0
+        self._live: Dict[int, int] = {} # segment -> deliveries without a done mark.
+        self._where: Dict[int, int] = {} # sequence number -> segment.
+
+        self._sync_waiters: List[asyncio.Future] = []
+        self._sync_handle: Optional[asyncio.TimerHandle] = None
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self._sync_tasks: Set[asyncio.Task] = set()
+        self._retired: List[asyncio.Future] = [] # fsyncs of rotated out segments, still running.
+
+        self.appended = 0
+        self.completed = 0
+        self.fsyncs = 0
+        self.replayed = 0
+
+    def __repr__(self) -> str:
+        fmt = "<DeliverySpool directory={0.directory!r} segment={0._segment!r} outstanding={0.outstanding!r}>"
+        return fmt.format(self)
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._where)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "segments": len(self._live),
+            "outstanding": self.outstanding,
+            "appended": self.appended,
+            "completed": self.completed,
+            "fsyncs": self.fsyncs,
+            "replayed": self.replayed
+        }
+
+    def _segments(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match is not None:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, _segment_name(segment))
+
+    def open(self) -> List[Delivery]:
+        """Opens a fresh segment and returns the deliveries left undone by an earlier run."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        found: Dict[int, Tuple[int, Delivery]] = {}
+        done = set()
+        segments = self._segments()
+        for segment in segments:
+            self._live.setdefault(segment, 0)
+            for kind, seq, meta, body in _read_records(self._path(segment)):
+                self._seq = max(self._seq, seq)
+                if kind == _DONE:
+                    done.add(seq)
+                else:
+                    meta = self._codec.loads(meta)
+                    delivery = Delivery(meta["headers"], body, received_at=meta["received_at"])
+                    delivery.spool_id = seq
+                    found[seq] = (segment, delivery)
+
+        pending = []
+        for seq in sorted(found):
+            if seq in done:
+                continue
+            segment, delivery = found[seq]
+            self._live[segment] += 1
+            self._where[seq] = segment
+            pending.append(delivery)
+
+        self._segment = segments[-1] if segments else 0
+        self._rotate()
+        self._collect()
+
+        if pending:
+            _log.info("Found %d undone deliveries in the spool at %s." % (len(pending), self.directory))
+        return pending
+
+    def _rotate(self):
+        old = self._file
+        self._segment += 1
+        self._live[self._segment] = 0
+        self._file = open(self._path(self._segment), "ab")
+
+        if old is not None:
+            # synced off the event loop. the next batched sync waits for it before
+            # acknowledging anything, since some of its appends may be in here.
+            old.flush()
+            fd = os.dup(old.fileno())
+            old.close()
+            loop = asyncio.get_running_loop()
+            self._retired.append(loop.run_in_executor(None, _fsync_and_close, fd))
+
+    def _collect(self):
+        # deletes fully done segments, oldest first. a newer segment may
+        # still hold the done marks for an older one, so order matters.
+        for segment in sorted(self._live):
+            if segment == self._segment or self._live[segment]:
+                break
+            del self._live[segment]
+            try:
+                os.remove(self._path(segment))
+            except FileNotFoundError:
+                pass
+
+    def _write(self, kind: int, seq: int, meta: bytes = b"", body: bytes = b""):
+        f = self._file
+        if f is None:
+            raise RuntimeError("The spool has not been opened.")
+
+        f.write(_HEADER.pack(kind, seq, len(meta), len(body), zlib.crc32(meta + body)) + meta + body)
+        f.flush()
+
+    async def append(self, delivery: Delivery) -> int:
+        """Writes a delivery and waits until it is on disk."""
+        if self._file.tell() >= self.segment_size:
+            self._rotate()
+
+        self._seq += 1
+        seq = self._seq
+        headers = {str(name): value for name, value in delivery.headers.items()}
+        meta = self._codec.dumps({"headers": headers, "received_at": delivery.received_at})
+        self._write(_DELIVERY, seq, meta, delivery.body)
+
+        delivery.spool_id = seq
+        self._where[seq] = self._segment
+        self._live[self._segment] += 1
+        self.appended += 1
+
+        await self._wait_for_sync()
+        return seq
+
+    def mark_done(self, seq: Optional[int]):
+        segment = self._where.pop(seq, None)
+        if segment is None:
+            return
+
+        # losing a done mark only means a replay, so it rides along with the next fsync.
+        self._write(_DONE, seq)
+        self._live[segment] -= 1
+        self.completed += 1
+        if not self._live[segment]:
+            self._collect()
+
+    def _wait_for_sync(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._sync_waiters.append(future)
+        if self._sync_handle is None:
+            self._sync_handle = loop.call_later(self.fsync_interval, self._start_sync)
+        return future
+
+    def _start_sync(self):
+        self._sync_handle = None
+        task = asyncio.ensure_future(self._sync())
+        self._sync_tasks.add(task)
+        task.add_done_callback(self._sync_tasks.discard)
+
+    async def _sync(self):
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+
+        async with self._sync_lock:
+            waiters, self._sync_waiters = self._sync_waiters, []
+            retired, self._retired = self._retired, []
+            if not waiters and not retired:
+                return
+
+            loop = asyncio.get_running_loop()
+            try:
+                # a duplicate, since append may rotate and close the segment while this runs.
+                fd = os.dup(self._file.fileno())
+                await asyncio.gather(loop.run_in_executor(None, _fsync_and_close, fd), *retired)
+            except Exception as exc:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+                return
+
+            self.fsyncs += 1
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def close(self):
+        if self._sync_handle is not None:
+            self._sync_handle.cancel()
+            self._sync_handle = None
+        if self._sync_tasks:
+            await asyncio.gather(*self._sync_tasks, return_exceptions=True)
+        await self._sync()
+
+        if self._file is not None:
+            # the done marks written since the last sync.
+            f, self._file = self._file, None
+            f.flush()
+            await asyncio.get_running_loop().run_in_executor(None, os.fsync, f.fileno())
+            f.close()
+
+        if self.outstanding:
+            _log.info("%d deliveries are still in the spool and will be replayed on the next start." % self.outstanding)
@@ -6,7 +6,8 @@ from typing import (
     TYPE_CHECKING,
     Dict,
     Union,
-    Optional
+    Optional,
+    Tuple
 )
 
 from .repository import Repository
@@ -14,6 +15,7 @@ from .installation import Installation
 from .issue import Issue
 from .comment import Comment
 from .user import BaseUser
+from .graphql import GraphQLLoader
 
 if TYPE_CHECKING:
     from .bot import GitBot
@@ -22,6 +24,8 @@ if TYPE_CHECKING:
         User,
         ApplicationUser
     )
+    from .iterators import PaginatedIterator
+    from .types.installation import Installation as InstallationPayload
 
 
 __all__ = (
@@ -36,6 +40,19 @@ class ApplicationState:
     This class is simply a class that holds internal caches and parses 
     events properly.
     """
+
+    # what each parser can dispatch, per action. None matches any other action.
+    # the router skips a parser when none of these have listeners.
+    parser_events: Dict[str, Dict[Optional[str], Tuple[str, ...]]] = {
+        "star": {
+            None: ("repository_star_update",)
+        },
+        "issue_comment": {
+            "created": ("comment_create",),
+            "edited": ("comment_edit",)
+        },
+    }
+
     def __init__(self, bot: GitBot):
         self._bot = bot
         self._http = bot.http
@@ -46,6 +63,11 @@ class ApplicationState:
         self._users: Dict[int, Union[BaseUser, User]] = {}
         self._installations: Dict[int, Installation] = {}
         self._issues: Dict[int, Issue] = {}
+        self._content_pacers = {} # used by bulk operations.
+
+        self._loader: Optional[GraphQLLoader] = None
+        if bot._graphql_batch_window is not None:
+            self._loader = GraphQLLoader(self, window=bot._graphql_batch_window)
 
         self.parsers = parsers = {}
         for attr, func in inspect.getmembers(self):
@@ -54,13 +76,10 @@ class ApplicationState:
 
     async def _call_initial_endpoints(self):
         # calls the relevant endpoints to fill the caches.
-        raw_installations = await self._http.fetch_installations()
         # raw_issues = await self._http.fetch_all_issues()
         raw_issues = [] # the http call currently is broken.
         
-        for installation in raw_installations:
-            installation_id = installation["id"]
-            self._installations[installation_id] = Installation(state=self, data=installation)
+        await self.installations().flatten() # fills the installation cache as pages arrive.
         
         for issue in raw_issues:
             repo_data = issue["repository"]
@@ -70,6 +89,15 @@ class ApplicationState:
             self._issues[issue_id] = _issue
 
         
+    def _store_installation(self, data: InstallationPayload) -> Installation:
+        installation = Installation(state=self, data=data)
+        self._installations[installation.id] = installation
+        return installation
+
+    def installations(self, *, prefetch: bool = True) -> PaginatedIterator[Installation]:
+        iterator = self._http.iter_installations(prefetch=prefetch)
+        return iterator.map(self._store_installation)
+
     def get_user(self, id: int, /) -> Optional[Union[BaseUser, User]]:
         user = self._users.get(id)
         return user
@@ -82,11 +110,20 @@ class ApplicationState:
         issue = self._installations.get(id)
         return issue
     
+    def _installation_id_from(self, data: dict) -> Optional[int]:
+        # app deliveries carry the installation they were sent for,
+        # which saves a round-trip when a listener wants a token.
+        installation = data.get("installation")
+        if installation is None:
+            return None
+        return installation["id"]
+
     def parse_star(self, data):
         repository = data["repository"]
         action = data["action"]
+        installation_id = self._installation_id_from(data)
 
-        repository = Repository(state=self, data=repository)
+        repository = Repository(state=self, data=repository, installation_id=installation_id)
         self._dispatch("repository_star_update", action, repository)
 
     def parse_issue_comment(self, data):
@@ -97,8 +134,9 @@ class ApplicationState:
         _comment = data["comment"]
         _repository = data["repository"]
         _sender = data["sender"]
+        installation_id = self._installation_id_from(data)
 
-        repo = Repository(state=self, data=_repository)
+        repo = Repository(state=self, data=_repository, installation_id=installation_id)
         issue = Issue(state=self, data=_issue, repository=repo)
         comment = Comment(state=self, data=_comment, issue=issue)
         sender = BaseUser(state=self, data=_sender)
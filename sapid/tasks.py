@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+
+__all__ = (
+    "ListenerStats",
+    "TaskSupervisor",
+)
+
+_log = logging.getLogger(__name__)
+
+class ListenerStats:
+    """Counters for one listener of one event."""
+
+    __slots__ = ("calls", "failures", "cancelled", "shed", "running", "waiting", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.shed = 0 # turned away because the backlog was full.
+        self.running = 0
+        self.waiting = 0 # in the backlog, held back by a concurrency cap.
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def __repr__(self) -> str:
+        fmt = "<ListenerStats calls={0.calls!r} failures={0.failures!r} running={0.running!r} waiting={0.waiting!r}>"
+        return fmt.format(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+# (order, event, callback, stats, args, kwargs)
+_Pending = Tuple[int, str, Callable[..., Awaitable[Any]], ListenerStats, Tuple[Any, ...], Dict[str, Any]]
+
+class TaskSupervisor:
+    """Owns every listener task the bot starts.
+
+    Tasks are held by strong references until they finish. At most
+    ``max_concurrency`` run at once overall, and ``max_per_event`` per event
+    name. A call over a cap waits in a backlog, without a task, and is started
+    in arrival order once a slot frees up. When ``max_backlog`` calls are
+    already waiting, new ones are shed. Exceptions from listeners are handed
+    to ``on_error``.
+    """
+    def __init__(
+        self,
+        *,
+        on_error: Callable[..., Awaitable[Any]],
+        max_concurrency: Optional[int] = None,
+        max_per_event: Optional[int] = None,
+        max_backlog: Optional[int] = None
+    ):
+        for name, value in (("max_concurrency", max_concurrency), ("max_per_event", max_per_event)):
+            if value is not None and value < 1:
+                raise ValueError("{0} must be at least 1.".format(name))
+
+        self._on_error = on_error
+        self.max_concurrency = max_concurrency
+        self.max_per_event = max_per_event
+        self.max_backlog = max_backlog
+
+        self._tasks: Set[asyncio.Task] = set()
+        self._running_per_event: Dict[str, int] = {}
+        self._backlog: Dict[str, Deque[_Pending]] = {} # event -> calls waiting for a slot.
+        self._backlog_size = 0
+        self._order = itertools.count()
+
+        # keyed by (event, listener qualname).
+        self.listeners: Dict[Tuple[str, str], ListenerStats] = {}
+        self.shed = 0
+
+    def __repr__(self) -> str:
+        fmt = "<TaskSupervisor tasks={0!r} backlog={1!r} max_concurrency={2.max_concurrency!r} max_per_event={2.max_per_event!r}>"
+        return fmt.format(len(self._tasks), self._backlog_size, self)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def tasks(self) -> Set[asyncio.Task]:
+        return set(self._tasks)
+
+    @property
+    def backlog(self) -> int:
+        return self._backlog_size
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "{0}:{1}".format(event, listener): stats.to_dict()
+            for (event, listener), stats in self.listeners.items()
+        }
+
+    def _has_slot(self, event: str) -> bool:
+        if self.max_concurrency is not None and len(self._tasks) >= self.max_concurrency:
+            return False
+        if self.max_per_event is not None and self._running_per_event.get(event, 0) >= self.max_per_event:
+            return False
+        return True
+
+    def spawn(self, event: str, callback: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Optional[asyncio.Task]:
+        """Starts ``callback`` as a task, or queues it if a cap is reached.
+
+        Returns the task, or None if the call was queued or shed.
+        """
+        listener = getattr(callback, "__qualname__", repr(callback))
+        key = (event, listener)
+        try:
+            stats = self.listeners[key]
+        except KeyError:
+            stats = self.listeners[key] = ListenerStats()
+
+        pending = (next(self._order), event, callback, stats, args, kwargs)
+        # behind anything already waiting for this event, so calls keep their order.
+        if self._has_slot(event) and event not in self._backlog:
+            return self._start(pending)
+
+        if self.max_backlog is not None and self._backlog_size >= self.max_backlog:
+            stats.shed += 1
+            self.shed += 1
+            _log.warning("Shed a call to %s for %s, the listener backlog is full." % (listener, event))
+            return None
+
+        try:
+            queue = self._backlog[event]
+        except KeyError:
+            queue = self._backlog[event] = deque()
+        queue.append(pending)
+        self._backlog_size += 1
+        stats.waiting += 1
+        return None
+
+    def _start(self, pending: _Pending) -> asyncio.Task:
+        _, event, callback, stats, args, kwargs = pending
+        listener = getattr(callback, "__qualname__", repr(callback))
+        coro = self._run(event, callback, stats, args, kwargs)
+        task = asyncio.create_task(coro, name="sapid: {0}: {1}".format(event, listener))
+
+        self._tasks.add(task)
+        self._running_per_event[event] = self._running_per_event.get(event, 0) + 1
+        task.add_done_callback(functools.partial(self._finished, event))
+        return task
+
+    def _finished(self, event: str, task: asyncio.Task):
+        self._tasks.discard(task)
+        running = self._running_per_event[event] - 1
+        if running:
+            self._running_per_event[event] = running
+        else:
+            del self._running_per_event[event]
+        self._pump()
+
+    def _pump(self):
+        # starts the oldest waiting calls that now fit under the caps.
+        while self._backlog:
+            eligible = [queue for event, queue in self._backlog.items() if self._has_slot(event)]
+            if not eligible:
+                return
+
+            queue = min(eligible, key=lambda queue: queue[0][0])
+            pending = queue.popleft()
+            event = pending[1]
+            if not queue:
+                del self._backlog[event]
+            self._backlog_size -= 1
+            pending[3].waiting -= 1
+            self._start(pending)
+
+    async def _run(
+        self,
+        event: str,
+        callback: Callable[..., Awaitable[Any]],
+        stats: ListenerStats,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any]
+    ):
+        stats.running += 1
+        started = time.perf_counter()
+        try:
+            await callback(*args, **kwargs)
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.failures += 1
+            try:
+                await self._on_error(event, *args, **kwargs)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.running -= 1
+            stats.calls += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for running and queued calls to finish. Returns whether they all did."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        # anything in the backlog is started as running tasks finish.
+        while self._tasks:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+            await asyncio.wait(self.tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        return not self._tasks and not self._backlog_size
+
+    async def cancel_all(self) -> List[str]:
+        """Drops the backlog and cancels running tasks. Returns the names of everything cut off."""
+        names = []
+        backlog, self._backlog, self._backlog_size = self._backlog, {}, 0
+        for queue in backlog.values():
+            for _, event, callback, stats, _, _ in queue:
+                stats.waiting -= 1
+                stats.cancelled += 1
+                names.append("sapid: {0}: {1}".format(event, getattr(callback, "__qualname__", repr(callback))))
+
+        tasks = self.tasks
+        for task in tasks:
+            task.cancel()
+            names.append(task.get_name())
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return names
@@ -0,0 +1,516 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from .types.user import User as UserPayload
+    from .types.repository import Respository as RepositoryPayload
+    from .types.issue import Issue as IssuePayload
+    from .types.comment import Comment as CommentPayload
+    from .types.installation import Installation as InstallationPayload
+
+
+__all__ = (
+    "FakeGitHub",
+)
+
+TIMESTAMP = "2022-01-01T00:00:00Z"
+
+class FakeGitHub:
+    """An in-process stand-in for the parts of the GitHub REST API that sapid calls.
+
+    Point a client at it with ``HTTPClient(..., base_url=fake.url)`` or
+    ``GitBot(..., api_base_url=fake.url)``. Responses are shaped like the
+    payloads in :mod:`sapid.types`. Latency, pagination, ETags, rate limits and
+    injected failures are all configurable, so throughput, retries and rate
+    limit handling can be exercised without touching GitHub.
+    """
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        installations: int = 3,
+        contributors: int = 250,
+        page_size: int = 30,
+        ratelimit: int = 5000,
+        ratelimit_window: float = 3600.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 502,
+        secondary_ratelimit_rate: float = 0.0,
+        archive_size: int = 1024 * 1024,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.installation_count = installations
+        self.contributor_count = contributors
+        self.page_size = page_size
+        self.ratelimit = ratelimit
+        self.ratelimit_window = ratelimit_window
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.secondary_ratelimit_rate = secondary_ratelimit_rate
+        self.archive_size = archive_size
+        self._random = random.Random(seed)
+
+        self.requests: Counter[Tuple[str, str]] = Counter()
+        self.not_modified = 0
+        self.failures_injected = 0
+
+        self._buckets: Dict[str, List[float]] = {} # identity -> [remaining, reset]
+        self._issues: Dict[Tuple[str, str, int], IssuePayload] = {}
+        self._comments: Dict[int, CommentPayload] = {}
+        self._tokens: Dict[str, int] = {}
+        self._revoked: Set[str] = set()
+        self._ids = itertools.count(1000)
+
+        self._app = web.Application(middlewares=[self._middleware])
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+        self._setup_routes()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self._app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=host, port=port)
+        await site.start()
+
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.url = "http://{0}:{1}".format(bound_host, bound_port)
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> FakeGitHub:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _setup_routes(self):
+        router = self._app.router
+        router.add_get("/app", self.get_app)
+        router.add_get("/app/installations", self.get_installations)
+        router.add_post("/app/installations/{installation_id}/access_tokens", self.create_access_token)
+        router.add_get("/repos/{owner}/{repo}/installation", self.get_repo_installation)
+        router.add_get("/repos/{owner}/{repo}/contributors", self.get_contributors)
+        router.add_post("/repos/{owner}/{repo}/issues", self.create_issue)
+        router.add_get("/repos/{owner}/{repo}/issues/comments/{comment_id}", self.get_comment)
+        router.add_get("/repos/{owner}/{repo}/issues/{number}", self.get_issue)
+        router.add_post("/repos/{owner}/{repo}/issues/{number}/comments", self.create_comment)
+        router.add_put("/repos/{owner}/{repo}/issues/{number}/lock", self.lock_issue)
+        router.add_delete("/repos/{owner}/{repo}/issues/{number}/lock", self.unlock_issue)
+        router.add_post("/repos/{owner}/{repo}/issues/{number}/labels", self.add_labels)
+        router.add_get("/repos/{owner}/{repo}/{format:(tarball|zipball)}", self.get_blob)
+        router.add_get("/repos/{owner}/{repo}/{format:(tarball|zipball)}/{ref}", self.get_blob)
+        router.add_get("/repos/{owner}/{repo}/contents/{path:.+}", self.get_blob)
+        router.add_get("/repos/{owner}/{repo}/releases/assets/{asset_id}", self.get_blob)
+
+    # payloads
+
+    @staticmethod
+    def make_user(id: int, login: Optional[str] = None, *, type: str = "User") -> UserPayload:
+        login = login or "user{}".format(id)
+        api = "https://api.github.com/users/" + login
+        return {
+            "login": login,
+            "id": id,
+            "node_id": "MDQ6VXNlcj{}".format(id),
+            "avatar_url": "https://avatars.githubusercontent.com/u/{}?v=4".format(id),
+            "url": api,
+            "html_url": "https://github.com/" + login,
+            "followers_url": api + "/followers",
+            "following_url": api + "/following{/other_user}",
+            "gists_url": api + "/gists{/gist_id}",
+            "starred_url": api + "/starred{/owner}{/repo}",
+            "subscriptions_url": api + "/subscriptions",
+            "organizations_url": api + "/orgs",
+            "repos_url": api + "/repos",
+            "events_url": api + "/events{/privacy}",
+            "received_events_url": api + "/received_events",
+            "type": type,
+            "site_admin": False
+        }
+
+    @classmethod
+    def make_repository(cls, owner: str, name: str, *, id: int = 1) -> RepositoryPayload:
+        full_name = "{0}/{1}".format(owner, name)
+        return {
+            "id": id,
+            "node_id": "MDEwOlJlcG9zaXRvcnk{}".format(id),
+            "name": name,
+            "full_name": full_name,
+            "private": False,
+            "owner": cls.make_user(1, owner),
+            "html_url": "https://github.com/" + full_name,
+            "description": "A repository served by FakeGitHub.",
+            "fork": False,
+            "url": "https://api.github.com/repos/" + full_name,
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+            "pushed_at": TIMESTAMP,
+            "git_url": "git://github.com/{}.git".format(full_name),
+            "ssh_url": "git@github.com:{}.git".format(full_name),
+            "clone_url": "https://github.com/{}.git".format(full_name),
+            "svn_url": "https://github.com/" + full_name,
+            "homepage": None,
+            "size": 108,
+            "stargazers_count": 80,
+            "watchers_count": 80,
+            "language": "Python",
+            "has_issues": True,
+            "has_projects": True,
+            "has_downloads": True,
+            "has_wiki": True,
+            "has_pages": False,
+            "forks_count": 9,
+            "mirror_url": None,
+            "archived": False,
+            "disabled": False,
+            "open_issues_count": 0,
+            "license": None,
+            "allow_forking": True,
+            "is_template": False,
+            "topics": [],
+            "visibility": "public",
+            "forks": 9,
+            "open_issues": 0,
+            "watchers": 80,
+            "default_branch": "main"
+        }
+
+    @classmethod
+    def make_issue(cls, owner: str, repo: str, number: int, *, id: int, title: str = "Found a bug", body: str = "It's broken.") -> IssuePayload:
+        api = "https://api.github.com/repos/{0}/{1}".format(owner, repo)
+        url = "{0}/issues/{1}".format(api, number)
+        return {
+            "url": url,
+            "repository_url": api,
+            "labels_url": url + "/labels{/name}",
+            "comments_url": url + "/comments",
+            "events_url": url + "/events",
+            "html_url": "https://github.com/{0}/{1}/issues/{2}".format(owner, repo, number),
+            "id": id,
+            "node_id": "MDU6SXNzdWU{}".format(id),
+            "number": number,
+            "title": title,
+            "user": cls.make_user(2),
+            "labels": [],
+            "state": "open",
+            "locked": False,
+            "assignee": cls.make_user(3),
+            "assignees": [cls.make_user(3)],
+            "comments": 0,
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+            "closed_at": None,
+            "author_association": "CONTRIBUTOR",
+            "body": body,
+            "reactions": {"url": url + "/reactions", "total_count": 0},
+            "timeline_url": url + "/timeline",
+            "performed_via_github_app": None
+        }
+
+    @classmethod
+    def make_comment(cls, owner: str, repo: str, number: int, *, id: int, body: str) -> CommentPayload:
+        api = "https://api.github.com/repos/{0}/{1}".format(owner, repo)
+        return {
+            "id": id,
+            "node_id": "MDEyOklzc3VlQ29tbWVudA{}".format(id),
+            "url": "{0}/issues/comments/{1}".format(api, id),
+            "html_url": "https://github.com/{0}/{1}/issues/{2}#issuecomment-{3}".format(owner, repo, number, id),
+            "body": body,
+            "user": cls.make_user(4, "sapid-bot[bot]", type="Bot"),
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+            "issue_url": "{0}/issues/{1}".format(api, number),
+            "author_association": "NONE"
+        }
+
+    @classmethod
+    def make_installation(cls, id: int) -> InstallationPayload:
+        return {
+            "id": id,
+            "account": cls.make_user(100 + id, "org{}".format(id), type="Organization"),
+            "repository_selection": "all",
+            "access_tokens_url": "https://api.github.com/app/installations/{}/access_tokens".format(id),
+            "repositories_url": "https://api.github.com/installation/repositories",
+            "html_url": "https://github.com/organizations/org{0}/settings/installations/{0}".format(id),
+            "app_id": 1,
+            "app_slug": "sapid-bot",
+            "target_type": "Organization",
+            "permissions": {"issues": "write", "metadata": "read"},
+            "events": ["issues", "issue_comment", "star"],
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+            "has_multiple_files": False,
+            "suspended_by": None,
+            "suspended_at": None
+        }
+
+    def _installation_for(self, owner: str) -> int:
+        # owners named orgN belong to installation N. Everything else goes to the first one.
+        if owner.startswith("org") and owner[3:].isdigit():
+            return int(owner[3:])
+        return 1
+
+    # plumbing
+
+    def revoke_tokens(self):
+        """Revokes every installation token issued so far. Requests made with them get a 401."""
+        self._revoked.update(self._tokens)
+        self._tokens.clear()
+
+    def _identity(self, request: web.Request) -> str:
+        authorization = request.headers.get("Authorization")
+        if authorization is None:
+            return "anonymous"
+        if authorization.startswith("Bearer "):
+            return "app"
+
+        token = authorization.split(" ", 1)[-1]
+        installation_id = self._tokens.get(token)
+        if installation_id is None:
+            return "token"
+        return "installation:{}".format(installation_id)
+
+    def _ratelimit_headers(self, identity: str) -> Dict[str, str]:
+        now = time.time()
+        bucket = self._buckets.get(identity)
+        if bucket is None or bucket[1] <= now:
+            bucket = self._buckets[identity] = [self.ratelimit, now + self.ratelimit_window]
+
+        return {
+            "X-RateLimit-Limit": str(self.ratelimit),
+            "X-RateLimit-Remaining": str(int(bucket[0])),
+            "X-RateLimit-Used": str(int(self.ratelimit - bucket[0])),
+            "X-RateLimit-Reset": str(int(bucket[1])),
+            "X-RateLimit-Resource": "core"
+        }
+
+    def _error(self, status: int, message: str, headers: Dict[str, str]) -> web.Response:
+        payload = {
+            "message": message,
+            "documentation_url": "https://docs.github.com/rest"
+        }
+        return web.json_response(payload, status=status, headers=headers)
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else request.path
+        self.requests[(request.method, route)] += 1
+
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        authorization = request.headers.get("Authorization", "")
+        if authorization.split(" ", 1)[-1] in self._revoked:
+            return self._error(401, "Bad credentials", {})
+
+        identity = self._identity(request)
+        headers = self._ratelimit_headers(identity)
+        bucket = self._buckets[identity]
+
+        if bucket[0] <= 0:
+            return self._error(403, "API rate limit exceeded for {}.".format(identity), headers)
+        if self._random.random() < self.secondary_ratelimit_rate:
+            headers["Retry-After"] = "1"
+            return self._error(403, "You have exceeded a secondary rate limit.", headers)
+        if self._random.random() < self.failure_rate:
+            self.failures_injected += 1
+            return self._error(self.failure_status, "Server Error", headers)
+
+        response = await handler(request)
+
+        if request.method == "GET" and response.status == 200:
+            etag = '"{}"'.format(hashlib.sha1(response.body).hexdigest())
+            response.headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                # GitHub doesn't charge conditional hits against the rate limit.
+                self.not_modified += 1
+                headers = self._ratelimit_headers(identity)
+                headers["ETag"] = etag
+                if "Link" in response.headers:
+                    headers["Link"] = response.headers["Link"]
+                return web.Response(status=304, headers=headers)
+
+        bucket[0] -= 1
+        response.headers.update(self._ratelimit_headers(identity))
+        return response
+
+    def _paginate(self, request: web.Request, items: List[Any]) -> web.Response:
+        per_page = min(int(request.query.get("per_page", self.page_size)), 100)
+        page = max(int(request.query.get("page", 1)), 1)
+        last = max((len(items) + per_page - 1) // per_page, 1)
+
+        start = (page - 1) * per_page
+        response = web.json_response(items[start:start + per_page])
+
+        links = []
+        base = request.url.with_query({"per_page": per_page})
+        if page < last:
+            links.append('<{0}>; rel="next"'.format(base.update_query(page=page + 1)))
+            links.append('<{0}>; rel="last"'.format(base.update_query(page=last)))
+        if page > 1:
+            links.append('<{0}>; rel="first"'.format(base.update_query(page=1)))
+            links.append('<{0}>; rel="prev"'.format(base.update_query(page=page - 1)))
+        if links:
+            response.headers["Link"] = ", ".join(links)
+        return response
+
+    def _issue(self, request: web.Request) -> IssuePayload:
+        owner = request.match_info["owner"]
+        repo = request.match_info["repo"]
+        number = int(request.match_info["number"])
+        key = (owner, repo, number)
+        try:
+            return self._issues[key]
+        except KeyError:
+            # every issue number exists, so load tests don't need any setup.
+            issue = self._issues[key] = self.make_issue(owner, repo, number, id=next(self._ids))
+            return issue
+
+    # handlers
+
+    async def get_app(self, request: web.Request) -> web.Response:
+        payload = {
+            "id": 1,
+            "slug": "sapid-bot",
+            "node_id": "MDM6QXBwMQ==",
+            "owner": self.make_user(1, "org1", type="Organization"),
+            "name": "Sapid Bot",
+            "description": "A bot served by FakeGitHub.",
+            "external_url": "https://example.com",
+            "html_url": "https://github.com/apps/sapid-bot",
+            "created_at": TIMESTAMP,
+            "updated_at": TIMESTAMP,
+            "permissions": {"issues": "write", "metadata": "read"},
+            "events": ["issues", "issue_comment", "star"],
+            "installations_count": self.installation_count
+        }
+        return web.json_response(payload)
+
+    async def get_installations(self, request: web.Request) -> web.Response:
+        installations = [self.make_installation(i) for i in range(1, self.installation_count + 1)]
+        return self._paginate(request, installations)
+
+    async def create_access_token(self, request: web.Request) -> web.Response:
+        installation_id = int(request.match_info["installation_id"])
+        token = "ghs_{:036x}".format(self._random.getrandbits(144))
+        self._tokens[token] = installation_id
+
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+        payload = {
+            "token": token,
+            "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "permissions": {"issues": "write", "metadata": "read"},
+            "repository_selection": "all"
+        }
+        return web.json_response(payload, status=201)
+
+    async def get_repo_installation(self, request: web.Request) -> web.Response:
+        installation_id = self._installation_for(request.match_info["owner"])
+        return web.json_response(self.make_installation(installation_id))
+
+    async def get_contributors(self, request: web.Request) -> web.Response:
+        contributors = [self.make_user(i) for i in range(1, self.contributor_count + 1)]
+        return self._paginate(request, contributors)
+
+    async def get_issue(self, request: web.Request) -> web.Response:
+        return web.json_response(self._issue(request))
+
+    async def create_issue(self, request: web.Request) -> web.Response:
+        owner = request.match_info["owner"]
+        repo = request.match_info["repo"]
+        data = await request.json()
+
+        number = len([key for key in self._issues if key[:2] == (owner, repo)]) + 1
+        issue = self.make_issue(owner, repo, number, id=next(self._ids), title=data["title"], body=data["body"])
+        self._issues[(owner, repo, number)] = issue
+        return web.json_response(issue, status=201)
+
+    async def create_comment(self, request: web.Request) -> web.Response:
+        issue = self._issue(request)
+        data = await request.json()
+
+        comment = self.make_comment(
+            request.match_info["owner"],
+            request.match_info["repo"],
+            issue["number"],
+            id=next(self._ids),
+            body=data["body"]
+        )
+        self._comments[comment["id"]] = comment
+        issue["comments"] += 1
+        return web.json_response(comment, status=201)
+
+    async def get_comment(self, request: web.Request) -> web.Response:
+        comment = self._comments.get(int(request.match_info["comment_id"]))
+        if comment is None:
+            return self._error(404, "Not Found", {})
+        return web.json_response(comment)
+
+    async def lock_issue(self, request: web.Request) -> web.Response:
+        self._issue(request)["locked"] = True
+        return web.Response(status=204)
+
+    async def unlock_issue(self, request: web.Request) -> web.Response:
+        self._issue(request)["locked"] = False
+        return web.Response(status=204)
+
+    async def add_labels(self, request: web.Request) -> web.Response:
+        issue = self._issue(request)
+        data = await request.json()
+
+        known = {label["name"] for label in issue["labels"]}
+        for name in data["labels"]:
+            if name not in known:
+                issue["labels"].append({"id": next(self._ids), "name": name, "color": "ededed", "default": False})
+        return web.json_response(issue["labels"])
+
+    def _blob(self, request: web.Request) -> bytes:
+        # deterministic per path, so resumed downloads can be checked against a fresh one.
+        seed = hashlib.sha256(request.path.encode("utf-8")).digest()
+        return (seed * (self.archive_size // len(seed) + 1))[:self.archive_size]
+
+    async def get_blob(self, request: web.Request) -> web.Response:
+        blob = self._blob(request)
+        etag = '"{}"'.format(hashlib.sha256(blob).hexdigest()[:16])
+        range_header = request.headers.get("Range", "")
+        if_range = request.headers.get("If-Range")
+        if not range_header.startswith("bytes=") or (if_range is not None and if_range != etag):
+            return web.Response(body=blob, content_type="application/octet-stream", headers={"ETag": etag})
+
+        start = int(range_header[len("bytes="):].split("-", 1)[0])
+        if start >= len(blob):
+            return web.Response(status=416, headers={"Content-Range": "bytes */{}".format(len(blob))})
+        return web.Response(
+            status=206,
+            body=blob[start:],
+            content_type="application/octet-stream",
+            headers={"Content-Range": "bytes {0}-{1}/{2}".format(start, len(blob) - 1, len(blob)), "ETag": etag}
+        )
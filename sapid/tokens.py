@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Optional
+)
+
+if TYPE_CHECKING:
+    from .http import HTTPClient
+
+
+__all__ = (
+    "AccessToken",
+    "TokenManager",
+)
+
+_log = logging.getLogger(__name__)
+
+EXPIRY_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+class AccessToken:
+    """An installation access token, as returned by
+    ``POST /app/installations/{installation_id}/access_tokens``.
+    """
+
+    if TYPE_CHECKING:
+        installation_id: int
+        token: str
+        expires_at: datetime
+        permissions: Dict[str, str]
+        repository_selection: Optional[str]
+
+    def __init__(self, installation_id: int, data: Dict[str, Any]):
+        self.installation_id = installation_id
+        self.token = data["token"]
+        self.expires_at = datetime.strptime(data["expires_at"], EXPIRY_FORMAT).replace(tzinfo=timezone.utc)
+        self.permissions = data.get("permissions", {})
+        self.repository_selection = data.get("repository_selection")
+        self._last_used: Optional[float] = None # only set when the cached token is handed out again.
+
+    def __repr__(self) -> str:
+        fmt = "<AccessToken installation_id={0.installation_id!r} expires_at={0.expires_at!r}>"
+        return fmt.format(self)
+
+    @property
+    def expires_in(self) -> float:
+        return self.expires_at.timestamp() - time.time()
+
+    def is_expired(self, *, margin: float = 0.0) -> bool:
+        return self.expires_in <= margin
+
+class TokenManager:
+    """Hands out installation access tokens, keyed by installation id.
+
+    Tokens are refreshed in the background ``refresh_margin`` seconds before
+    they expire, as long as they were used since they were issued. Concurrent
+    refreshes for the same installation share one request.
+    """
+    def __init__(
+        self,
+        http: HTTPClient,
+        *,
+        refresh_margin: float = 300.0,
+        expiry_margin: float = 60.0
+    ):
+        self._http = http
+        self.refresh_margin = refresh_margin
+        self.expiry_margin = expiry_margin
+
+        self._tokens: Dict[int, AccessToken] = {}
+        self._identities: Dict[str, int] = {}
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+
+    def get_cached(self, installation_id: int, /) -> Optional[AccessToken]:
+        return self._tokens.get(installation_id)
+
+    def installation_for(self, token: str) -> Optional[int]:
+        return self._identities.get(token)
+
+    async def get(self, installation_id: int, *, force: bool = False) -> AccessToken:
+        token = self._tokens.get(installation_id)
+        if token is not None and not force and not token.is_expired(margin=self.expiry_margin):
+            token._last_used = time.time()
+            return token
+
+        return await self.refresh(installation_id)
+
+    async def refresh(self, installation_id: int) -> AccessToken:
+        try:
+            task = self._inflight[installation_id]
+        except KeyError:
+            task = asyncio.ensure_future(self._refresh(installation_id))
+            self._inflight[installation_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(installation_id, None))
+
+        # shielded, so one cancelled caller doesn't cancel the refresh for everyone else.
+        return await asyncio.shield(task)
+
+    async def _refresh(self, installation_id: int) -> AccessToken:
+        _log.debug("Refreshing access token for installation %s" % installation_id)
+        data = await self._http.fetch_access_token(installation_id)
+        token = AccessToken(installation_id, data)
+
+        old = self._tokens.get(installation_id)
+        if old is not None:
+            self._identities.pop(old.token, None)
+
+        self._tokens[installation_id] = token
+        self._identities[token.token] = installation_id
+        self._schedule_refresh(token)
+        return token
+
+    def _schedule_refresh(self, token: AccessToken):
+        installation_id = token.installation_id
+        timer = self._timers.pop(installation_id, None)
+        if timer is not None:
+            timer.cancel()
+
+        delay = max(token.expires_in - self.refresh_margin, 0.0)
+        loop = asyncio.get_running_loop()
+        self._timers[installation_id] = loop.call_later(delay, self._background_refresh, token)
+
+    def _background_refresh(self, token: AccessToken):
+        installation_id = token.installation_id
+        self._timers.pop(installation_id, None)
+
+        if self._tokens.get(installation_id) is not token:
+            return # something else already replaced it.
+
+        if token._last_used is None:
+            # nobody reused this token. It'll be fetched on demand next time.
+            return
+
+        def _log_failure(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                _log.warning(
+                    "Background refresh of the access token for installation %s failed: %r" % (installation_id, task.exception())
+                )
+
+        if installation_id not in self._inflight:
+            task = asyncio.ensure_future(self.refresh(installation_id))
+            task.add_done_callback(_log_failure)
+
+    def invalidate(self, installation_id: int, /):
+        token = self._tokens.pop(installation_id, None)
+        if token is not None:
+            self._identities.pop(token.token, None)
+
+        timer = self._timers.pop(installation_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+        for task in self._inflight.values():
+            task.cancel()
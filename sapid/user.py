@@ -8,7 +8,7 @@ from typing import (
     List
 )
 
-from .utils import parse_to_dt
+from .utils import lazy_field, set_payload, _dt_field
 
 if TYPE_CHECKING:
     from .types.user import User as UserPayload
@@ -21,6 +21,10 @@ __all__ = (
     "User",
 )
 
+def _user_field(instance, data: UserPayload) -> BaseUser:
+    # a lazy_field converter for nested users.
+    return BaseUser(state=instance._state, data=data)
+
 class BaseUser:
 
     if TYPE_CHECKING:
@@ -51,23 +55,25 @@ class BaseUser:
         return fmt.format(self)
 
     def _update(self, data: UserPayload):
-        self.login = data["login"]
-        self.id = data["id"]
-        self.node_id = data["node_id"]
-        self.avatar_url = data["avatar_url"]
-        self.url = data["url"]
-        self.html_url = data["html_url"]
-        self.followers_url = data["html_url"]
-        self.following_url = data["following_url"]
-        self.gists_url = data["gists_url"]
-        self.starred_url = data["starred_url"]
-        self.subscriptions_url = data["subscriptions_url"]
-        self.organizations_url = data["organizations_url"]
-        self.repos_url = data["repos_url"]
-        self.events_url = data["events_url"]
-        self.received_events_url = data["received_events_url"]
-        self.type = data["type"]
-        self.site_admin = data["site_admin"]
+        set_payload(self, data)
+
+    login = lazy_field()
+    id = lazy_field()
+    node_id = lazy_field()
+    avatar_url = lazy_field()
+    url = lazy_field()
+    html_url = lazy_field()
+    followers_url = lazy_field()
+    following_url = lazy_field()
+    gists_url = lazy_field()
+    starred_url = lazy_field()
+    subscriptions_url = lazy_field()
+    organizations_url = lazy_field()
+    repos_url = lazy_field()
+    events_url = lazy_field()
+    received_events_url = lazy_field()
+    type = lazy_field()
+    site_admin = lazy_field()
 
 class User(BaseUser):
 
@@ -102,42 +108,28 @@ class User(BaseUser):
         fmt = "<User login={0.login!r} id={0.id!r} site_admin={0.site_admin!r} hireable={0.hireable!r} email={0.email!r}>"
         return fmt.format(self)
 
-    def _update(self, data: UserPayload):
-        super()._update(data)
-        self.name = data.get("name")
-        self.company = data.get("company")
-        self.blog = data.get("blog")
-        self.location = data.get("location")
-        self.email = data.get("email")
-        self.hireable = data.get("hireable")
-        self.bio = data.get("bio")
-        self.twitter_username = data.get("twitter_username")
-        self.public_repos = data.get("public_repos")
-        self.public_gists = data.get("public_gists")
-        self.followers = data.get("followers")
-        self.following = data.get("following")
-        self._created_at = data.get("created_at")
-        self._updated_at = data.get("updated_at")
-        self.private_gists = data.get("private_gists")
-        self.total_private_repos = data.get("total_private_repos") 
-        self.owned_private_repos = data.get("owned_private_repos") 
-        self.disk_usage = data.get("disk_usage") 
-        self.collaborators = data.get("collaborators") 
-        self.two_factor_authentication = data.get("two_factor_authentication") 
-        self.gravatar_id = data.get("gravatar_id") 
-        self.plan = data.get("plan") 
-
-    @property
-    def created_at(self) -> datetime:
-        _created_at = self._created_at
-        dt = parse_to_dt(_created_at)
-        return dt
-
-    @property
-    def updated_at(self) -> datetime:
-        _updated_at = self._updated_at
-        dt = parse_to_dt(_updated_at)
-        return dt
+    name = lazy_field(default=None)
+    company = lazy_field(default=None)
+    blog = lazy_field(default=None)
+    location = lazy_field(default=None)
+    email = lazy_field(default=None)
+    hireable = lazy_field(default=None)
+    bio = lazy_field(default=None)
+    twitter_username = lazy_field(default=None)
+    public_repos = lazy_field(default=None)
+    public_gists = lazy_field(default=None)
+    followers = lazy_field(default=None)
+    following = lazy_field(default=None)
+    created_at = lazy_field(convert=_dt_field, default=None)
+    updated_at = lazy_field(convert=_dt_field, default=None)
+    private_gists = lazy_field(default=None)
+    total_private_repos = lazy_field(default=None)
+    owned_private_repos = lazy_field(default=None)
+    disk_usage = lazy_field(default=None)
+    collaborators = lazy_field(default=None)
+    two_factor_authentication = lazy_field(default=None)
+    gravatar_id = lazy_field(default=None)
+    plan = lazy_field(default=None)
 
 
 class ApplicationUser:
@@ -162,29 +154,18 @@ class ApplicationUser:
         self._update(data)
         
     def _update(self, data: ApplicationUserPayload):
-        self.id = data["id"]
-        self.slug = data["slug"]
-        self.node_id = data["node_id"]
-        self.owner = BaseUser(state=self._state, data=data["owner"])
-        self.name = data["name"]
-        self.description = data["description"]
-        self.external_url = data["external_url"]
-        self.html_url = data["html_url"]
-        self._created_at = data["created_at"]
-        self._updated_at = data["updated_at"]
-        self.permissions = data["permissions"]
-        self.events = data["events"]
-        self.installations_count = data["installations_count"]
-
-    @property
-    def created_at(self) -> datetime:
-        _created_at = self._created_at
-        dt = parse_to_dt(_created_at)
-        return dt
-
-    @property
-    def updated_at(self) -> datetime:
-        _updated_at = self._updated_at
-        dt = parse_to_dt(_updated_at)
-        return dt
-    
\ No newline at end of file
+        set_payload(self, data)
+
+    id = lazy_field()
+    slug = lazy_field()
+    node_id = lazy_field()
+    owner = lazy_field(convert=_user_field)
+    name = lazy_field()
+    description = lazy_field()
+    external_url = lazy_field()
+    html_url = lazy_field()
+    created_at = lazy_field(convert=_dt_field)
+    updated_at = lazy_field(convert=_dt_field)
+    permissions = lazy_field()
+    events = lazy_field()
+    installations_count = lazy_field()
@@ -1,22 +1,27 @@
 from __future__ import annotations
 
+import functools
 from datetime import datetime
 from typing import (
     Any,
+    Dict,
     List,
     Optional,
     Union,
+    Callable,
     Coroutine,
+    Tuple,
     TYPE_CHECKING
 )
 
 import jwt
 
 if TYPE_CHECKING:
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
     from .state import ApplicationState
 
 
-def generate_jwt(payload: dict, key: str, headers: dict, algorithm: str = "RS256"):
+def generate_jwt(payload: dict, key: Union[str, RSAPrivateKey], headers: dict, algorithm: str = "RS256"):
     token = jwt.encode(
         payload=payload,
         key=key,
@@ -26,12 +31,33 @@ def generate_jwt(payload: dict, key: str, headers: dict, algorithm: str = "RS256
 
     return token
 
+def parse_link_header(value: Optional[str]) -> Dict[str, str]:
+    # <https://api.github.com/...?page=2>; rel="next", <...>; rel="last"
+    links = {}
+    if not value:
+        return links
+
+    for part in value.split(","):
+        url, _, params = part.partition(";")
+        url = url.strip().lstrip("<").rstrip(">")
+        for param in params.split(";"):
+            name, _, rel = param.strip().partition("=")
+            if name == "rel":
+                for r in rel.strip('"').split():
+                    links[r] = url
+
+    return links
+
 TIMESTAMP_FORMAT = "YYYY-MM-DDTHH:MM:SSZ"
 
 def parse_to_dt(text: str, _format: str = TIMESTAMP_FORMAT):
     return None # this function is broken. for now we will return None
     return datetime.strptime(text, _format)
 
+def _dt_field(_, text: str):
+    # a lazy_field converter.
+    return parse_to_dt(text)
+
 def safe_convert(_type: type, _data, *args, **kwargs):
     # a function to convert raw data into a python object.
     # its 'safe' as it will handle data being None.
@@ -44,7 +70,7 @@ def _parse_list_to_object(_object_type: type, *, state: ApplicationState, data:
     _os = []
     for item in data:
         try:
-            obj = _object_type(state=state, data=data, **kwargs)
+            obj = _object_type(state=state, data=item, **kwargs)
         except Exception:
             continue
         _os.append(obj)
@@ -62,6 +88,94 @@ class Cacheable:
     def get_cache(self, key: Any):
         return self.__mutable_cache__.get(key)
 
+MISSING: Any = object()
+
+class lazy_field:
+    """Reads ``key`` from the model's raw payload the first time it is accessed.
+
+    ``convert`` is called as ``convert(instance, value)`` to build nested objects
+    or parse fields, and is skipped for ``None``. The result is memoized on the
+    instance, so later reads are plain attribute lookups, and assigning to the
+    attribute overrides it.
+
+    A field without a ``default`` is required: :func:`set_payload` raises
+    ``KeyError`` for a payload without its key, and reading it from a payload
+    that lost the key raises ``AttributeError``.
+    """
+
+    __slots__ = ("key", "name", "convert", "default")
+
+    def __init__(
+        self,
+        key: Optional[str] = None,
+        *,
+        convert: Optional[Callable[[Any, Any], Any]] = None,
+        default: Any = MISSING
+    ):
+        self.key = key
+        self.name = key
+        self.convert = convert
+        self.default = default
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+        if self.key is None:
+            self.key = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+
+        data = instance._data
+        if self.default is MISSING:
+            try:
+                value = data[self.key]
+            except KeyError as exc:
+                # so getattr() with a default and hasattr() behave.
+                raise AttributeError(
+                    "{0.__class__.__name__!r} payload has no {1!r} for {2!r}".format(instance, self.key, self.name)
+                ) from exc
+        else:
+            value = data.get(self.key, self.default)
+
+        if value is not None and self.convert is not None:
+            value = self.convert(instance, value)
+
+        instance.__dict__[self.name] = value
+        return value
+
+@functools.lru_cache(maxsize=None)
+def _lazy_field_names(cls: type) -> Tuple[str, ...]:
+    return tuple(
+        name
+        for klass in cls.__mro__
+        for name, attr in vars(klass).items()
+        if isinstance(attr, lazy_field)
+    )
+
+@functools.lru_cache(maxsize=None)
+def _required_keys(cls: type) -> Tuple[str, ...]:
+    fields: Dict[str, lazy_field] = {}
+    for klass in cls.__mro__:
+        for name, attr in vars(klass).items():
+            # the first one found wins, like attribute lookup.
+            if name not in fields and isinstance(attr, lazy_field):
+                fields[name] = attr
+    return tuple(field.key for field in fields.values() if field.default is MISSING)
+
+def set_payload(obj: Any, data: Dict[str, Any]):
+    # swaps the raw payload behind an object's lazy fields,
+    # dropping anything memoized from the previous one.
+    for key in _required_keys(type(obj)):
+        if key not in data:
+            # fails where the eager constructors did, not on some later read.
+            raise KeyError(key)
+
+    if "_data" in obj.__dict__:
+        for name in _lazy_field_names(type(obj)):
+            obj.__dict__.pop(name, None)
+    obj._data = data
+
 NUMSTR = Union[str, int]
 PAYLOADITEMTYPE = Union[str, bool, list, int]
 
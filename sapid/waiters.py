@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+
+__all__ = (
+    "WaiterRegistry",
+)
+
+Check = Callable[..., bool]
+
+class WaiterRegistry:
+    """Futures waiting for the next dispatch of an event, indexed by event name.
+
+    A dispatch only looks at the waiters of its own event. A waiter leaves the
+    registry as soon as it is resolved, cancelled or timed out, and an event
+    with no waiters left is dropped, so stale waiters are never scanned.
+    """
+    def __init__(self):
+        self._waiters: Dict[str, Dict[asyncio.Future, Optional[Check]]] = {}
+        self.resolved = 0
+
+    def __len__(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def __repr__(self) -> str:
+        return "<WaiterRegistry events={0!r} waiters={1!r}>".format(len(self._waiters), len(self))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "events": len(self._waiters),
+            "waiters": len(self),
+            "resolved": self.resolved
+        }
+
+    def has(self, event: str) -> bool:
+        return event in self._waiters
+
+    def events(self) -> List[str]:
+        return list(self._waiters)
+
+    def add(self, event: str, check: Optional[Check] = None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            waiters = self._waiters[event]
+        except KeyError:
+            waiters = self._waiters[event] = {}
+        waiters[future] = check
+        future.add_done_callback(functools.partial(self._discard, event))
+        return future
+
+    def remove(self, event: str, future: asyncio.Future):
+        if not future.done():
+            future.cancel()
+        self._discard(event, future)
+
+    def _discard(self, event: str, future: asyncio.Future):
+        waiters = self._waiters.get(event)
+        if waiters is None:
+            return
+        waiters.pop(future, None)
+        if not waiters:
+            del self._waiters[event]
+
+    def resolve(self, event: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> int:
+        """Resolves the waiters of ``event`` whose check passes. Returns how many were resolved.
+
+        A waiter's result is the dispatched argument, a tuple of them if there
+        are several, or None if there are none. If its check raises, the
+        exception is set on the waiter instead.
+        """
+        waiters = self._waiters.get(event)
+        if not waiters:
+            return 0
+
+        if not args:
+            result = None
+        elif len(args) == 1:
+            result = args[0]
+        else:
+            result = args
+
+        resolved = 0
+        for future, check in list(waiters.items()):
+            if future.done():
+                continue # its done callback hasn't run yet.
+            try:
+                if check is not None and not check(*args, **kwargs):
+                    continue
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+                resolved += 1
+            # gone now rather than when the done callback runs.
+            self._discard(event, future)
+
+        self.resolved += resolved
+        return resolved
+
+    def cancel_all(self) -> int:
+        futures = [future for waiters in self._waiters.values() for future in waiters]
+        self._waiters.clear()
+        for future in futures:
+            future.cancel()
+        return len(futures)
@@ -18,7 +18,8 @@ with open("README.md", "r") as f:
     readme = f.read()
 
 extras_require = {
-    "proxy-support": ["aiohttp_remotes"]
+    "proxy-support": ["aiohttp_remotes"],
+    "speed": ["orjson"]
 }
 
 packages = [